@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, Languages, Frameworks
+from .models import User, Languages, Frameworks, SmsMessage
 from django.contrib.auth.admin import UserAdmin
 
 
@@ -80,7 +80,15 @@ class UserAdminConfig(UserAdmin):
     )
 
 
+class SmsMessageAdmin(admin.ModelAdmin):
+    list_display = ("phone", "body_id", "rec_id", "status", "created_date")
+    list_filter = ("status", "body_id")
+    search_fields = ("phone", "rec_id")
+    readonly_fields = ("delivery_code", "created_date", "updated_date")
+
+
 admin.site.site_header = "Tech Cafe Admin Panel"
 admin.site.register(User, UserAdminConfig)
 admin.site.register(Languages)
 admin.site.register(Frameworks)
+admin.site.register(SmsMessage, SmsMessageAdmin)
@@ -0,0 +1,21 @@
+from django.conf import settings
+from rest_framework.exceptions import Throttled
+from accounts.hashers import PasswordHashingBusy, hashing_wait
+from utils.constants import Errors
+
+
+class HashingWaitMixin:
+    """
+    For views that hash passwords: a hash waits up to
+    settings.PASSWORD_HASH_WAIT seconds for a free slot, then the request is
+    answered with a 429 instead of queueing up behind the others.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with hashing_wait(settings.PASSWORD_HASH_WAIT):
+            return super().dispatch(request, *args, **kwargs)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, PasswordHashingBusy):
+            exc = Throttled(wait=1, detail=Errors.PASSWORD_HASHING_BUSY["detail"])
+        return super().handle_exception(exc)
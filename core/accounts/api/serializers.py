@@ -2,15 +2,41 @@ from rest_framework import serializers
 from accounts.models import User, Languages, Frameworks
 from django.contrib.auth.password_validation import validate_password
 from django.core import exceptions
-from django.core.cache import cache
 from validators.fieldvalidators import FieldValidators
 from utils.constants import Errors
 from django.shortcuts import get_object_or_404
-from django.core.cache import cache
-from django.conf import settings
-from accounts.tasks import send_otp
-import random
+from accounts.services.otp import OneTimePassword, OTPRateLimited
+from accounts.tasks import queue_otp
 from rest_framework import status
+from rest_framework.throttling import BaseThrottle
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from accounts.services.auth_state import get_auth_state, is_revoked
+
+# Serializer for obtaining a JWT pair with the claims of a stateless user
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    """
+    The tokens carry the phone and flags of the user, so StatelessJWTAuthentication
+    can build the request user without loading it.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token["phone"] = user.phone
+        token["is_staff"] = user.is_staff
+        token["is_ban"] = user.is_ban
+        return token
+
+# Serializer for refreshing a JWT, refuses revoked refresh tokens
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        _, revoked_at = get_auth_state(refresh[api_settings.USER_ID_CLAIM])
+        if is_revoked(refresh.get("iat", 0), revoked_at):
+            raise InvalidToken("Token has been revoked")
+        return super().validate(attrs)
 
 # Serializer for user registration with password checkup
 class RegisterSerializer(serializers.ModelSerializer):
@@ -42,15 +68,12 @@ class RegisterSerializer(serializers.ModelSerializer):
         if attrs.get("password") != attrs.get("password1"):
             raise serializers.ValidationError(Errors.PASSWORD_MISMATCHED)
 
-        # Validate OTP code
-        if cache.get(f"register:{attrs.get('phone')}") != None:
-            if attrs.get("otp_code") == cache.get(f"register:{attrs.get('phone')}"):
-                cache.delete(f"register:{attrs.get('phone')}")
-                attrs.pop("otp_code", None)
-            else:
-                raise serializers.ValidationError(Errors.INVALID_OTP_CODE)
-        else:
+        # Validate (and consume) OTP code
+        if not OneTimePassword("register", attrs.get("phone")).verify(
+            attrs.get("otp_code")
+        ):
             raise serializers.ValidationError(Errors.INVALID_OTP_CODE)
+        attrs.pop("otp_code", None)
         return super().validate(attrs)
 
     def create(self, validated_data):
@@ -60,6 +83,29 @@ class RegisterSerializer(serializers.ModelSerializer):
         return User.objects.create_user(**validated_data)
 
 
+# Field for the URLs of the resized avatar of a user
+class AvatarVariantsField(serializers.ReadOnlyField):
+    """
+    The avatar variants as {size: {"webp": url, "jpeg": url}}, or of one
+    `size` only (null until they are processed).
+    """
+
+    def __init__(self, size=None, **kwargs):
+        super().__init__(**kwargs)
+        self.size = size
+
+    def to_representation(self, value):
+        request = self.context.get("request")
+        variants = {
+            size: {
+                image_format: request.build_absolute_uri(url) if request else url
+                for image_format, url in formats.items()
+            }
+            for size, formats in value.items()
+        }
+        return variants.get(self.size) if self.size else variants
+
+
 # Serializer for managing user profile info
 class ProfileSerializer(serializers.ModelSerializer):
     """Profile serializer to manage extra user info"""
@@ -76,6 +122,7 @@ class ProfileSerializer(serializers.ModelSerializer):
         write_only=True,
         required=False,
     )
+    avatar_variants = AvatarVariantsField()
 
     class Meta:
         model = User
@@ -87,6 +134,7 @@ class ProfileSerializer(serializers.ModelSerializer):
             "last_name",
             "email",
             "avatar",
+            "avatar_variants",
             "job_field",
             "languages",
             "frameworks",
@@ -101,14 +149,10 @@ class ProfileSerializer(serializers.ModelSerializer):
                 db_phone = User.objects.get(phone=attrs.get("phone"))
             except User.DoesNotExist:
                 if attrs.get("otp_code") != None:
-                    if cache.get(f"register:{attrs.get('phone')}") != None:
-                        if attrs.get("otp_code") == cache.get(
-                            f"register:{attrs.get('phone')}"
-                        ):
-                            cache.delete(f"register:{attrs.get('phone')}")
-                            attrs.pop("otp_code", None)
-                        else:
-                            raise serializers.ValidationError(Errors.INVALID_OTP_CODE)
+                    if OneTimePassword("register", attrs.get("phone")).verify(
+                        attrs.get("otp_code")
+                    ):
+                        attrs.pop("otp_code", None)
                     else:
                         raise serializers.ValidationError(Errors.INVALID_OTP_CODE)
                 else:
@@ -194,40 +238,22 @@ class OTPSendSerializer(serializers.Serializer):
         otp_type = self.validated_data["otp_type"]
         if otp_type == "register_otp":
             user_obj = User.objects.filter(phone=phone).exists()
-            if not user_obj:
-                if cache.get(f"register:{phone}") == None:
-                    generate_otp = random.randint(1000, 9999)
-                    cache.set(
-                        f"register:{phone}", f"{generate_otp}", settings.OTP_CODE_TIME
-                    )
-                    if send_otp.delay(phone, generate_otp):
-                        return {"detail": "ok"}, status.HTTP_200_OK
-                    else:
-                        return (
-                            Errors.SMS_PANEL,
-                            status.HTTP_502_BAD_GATEWAY,
-                        )
-                else:
-                    return Errors.OTP_SPAM, status.HTTP_406_NOT_ACCEPTABLE
-            else:
+            if user_obj:
                 return {
                     "detail": "The User Already Registered"
                 }, status.HTTP_406_NOT_ACCEPTABLE
+            otp = OneTimePassword("register", phone)
         elif otp_type == "reset_password_otp":
             get_object_or_404(User, phone=phone)
-            if cache.get(f"reset_password:{phone}") == None:
-                generate_otp = random.randint(1000, 9999)
-                cache.set(
-                    f"reset_password:{phone}",
-                    f"{generate_otp}",
-                    settings.OTP_CODE_TIME,
-                )
-                if send_otp.delay(phone, generate_otp):
-                    return {"detail": "ok"}, status.HTTP_200_OK
-                else:
-                    return (
-                        Errors.SMS_PANEL,
-                        status.HTTP_502_BAD_GATEWAY,
-                    )
-            else:
-                return Errors.OTP_SPAM, status.HTTP_406_NOT_ACCEPTABLE
+            otp = OneTimePassword("reset_password", phone)
+
+        try:
+            code = otp.issue(BaseThrottle().get_ident(self.context["request"]))
+        except OTPRateLimited:
+            return Errors.OTP_LIMIT, status.HTTP_429_TOO_MANY_REQUESTS
+        if code is None:
+            return Errors.OTP_SPAM, status.HTTP_406_NOT_ACCEPTABLE
+        # The SMS is sent in the background, its result is read with the
+        # request id from the otp status endpoint.
+        request_id = queue_otp(phone, code, otp.purpose)
+        return {"detail": "ok", "request_id": request_id}, status.HTTP_200_OK
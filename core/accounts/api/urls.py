@@ -6,9 +6,10 @@ from .views import (
     ChangePasswordAPIView,
     ResetPasswordAPIView,
     OTPSendAPIView,
+    OTPStatusAPIView,
+    TokenObtainPairView,
 )
 from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
     TokenRefreshView,
     TokenVerifyView,
 )
@@ -26,4 +27,7 @@ urlpatterns = [
     ),
     path("reset-password/", ResetPasswordAPIView.as_view(), name="change_password"),
     path("otp/send/", OTPSendAPIView.as_view(), name="otp_register_send"),
+    path(
+        "otp/status/<uuid:request_id>/", OTPStatusAPIView.as_view(), name="otp_status"
+    ),
 ]
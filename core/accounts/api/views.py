@@ -2,7 +2,13 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.throttling import ScopedRateThrottle
+from rest_framework.views import APIView
+from rest_framework_simplejwt import views as jwt_views
+from celery import states
+from celery.result import AsyncResult
 from django.shortcuts import get_object_or_404
+from .mixins import HashingWaitMixin
 from .serializers import (
     ProfileSerializer,
     RegisterSerializer,
@@ -11,14 +17,19 @@ from .serializers import (
     OTPSendSerializer,
 )
 from accounts.models import User
-import random
-from django.core.cache import cache
+from accounts.services.auth_state import revoke_tokens
+from accounts.services.otp import OneTimePassword
 from accounts.tasks import send_otp
 from utils.constants import Errors
 from django.conf import settings
 
+# View to log in with the phone and password, see TokenObtainPairSerializer.
+class TokenObtainPairView(HashingWaitMixin, jwt_views.TokenObtainPairView):
+    pass
+
+
 # View to handle user registration.
-class RegisterApiView(generics.CreateAPIView):
+class RegisterApiView(HashingWaitMixin, generics.CreateAPIView):
     """
     When a user registers, they send their registration data to this view. It uses the RegisterSerializer to validate and process the input data, creating a new user account in the process.
     """
@@ -39,11 +50,11 @@ class ProfileApiView(generics.RetrieveUpdateAPIView):
     # For not sending pk in URL:
     def get_object(self):
         queryset = self.get_queryset()
-        obj = get_object_or_404(queryset, phone=self.request.user)
+        obj = get_object_or_404(queryset, pk=self.request.user.pk)
         return obj
 
 # View to change a user's password.
-class ChangePasswordAPIView(generics.GenericAPIView):
+class ChangePasswordAPIView(HashingWaitMixin, generics.GenericAPIView):
     """
     Authenticated users can use this view to update their passwords. It checks the old password for validation and updates the user's password with the new one. The ChangePasswordSerializer handles input validation.
     """
@@ -52,7 +63,8 @@ class ChangePasswordAPIView(generics.GenericAPIView):
     serializer_class = ChangePasswordSerializer
 
     def get_object(self):
-        obj = self.request.user
+        # the request user is built from the token claims, load the model
+        obj = get_object_or_404(self.get_queryset(), pk=self.request.user.pk)
         return obj
 
     def put(self, request, *args, **kwargs):
@@ -68,6 +80,7 @@ class ChangePasswordAPIView(generics.GenericAPIView):
             # set_password also hashes the password that the user will get
             self.object.set_password(serializer.data.get("new_password"))
             self.object.save()
+            revoke_tokens(self.object.pk)
             return Response(
                 {"detail": "password changed successfully"}, status=status.HTTP_200_OK
             )
@@ -75,7 +88,7 @@ class ChangePasswordAPIView(generics.GenericAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 # View to reset a user's password using OTP.
-class ResetPasswordAPIView(generics.CreateAPIView):
+class ResetPasswordAPIView(HashingWaitMixin, generics.CreateAPIView):
     """
     Users who forget their passwords can request a reset through this view. It validates the OTP code and updates the password if the code is correct. Caching is used to store and validate OTP codes.
     """
@@ -85,27 +98,17 @@ class ResetPasswordAPIView(generics.CreateAPIView):
     def create(self, request):
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
-            if cache.get(f"reset_password:{serializer.data['phone']}") != None:
-                if queryset := get_object_or_404(User, phone=serializer.data["phone"]):
-                    if serializer.data["otp_code"] == cache.get(
-                        f"reset_password:{serializer.data['phone']}"
-                    ):
-                        queryset.set_password(serializer.data.get("new_password"))
-                        queryset.save()
-                        cache.delete(f"reset_password:{serializer.data['phone']}")
-                        return Response(
-                            {"detail": "password successfully changed"},
-                            status=status.HTTP_200_OK,
-                        )
-                    else:
-                        return Response(
-                            Errors.INVALID_OTP_CODE,
-                            status=status.HTTP_406_NOT_ACCEPTABLE,
-                        )
-                else:
-                    return Response(
-                        {"detail": "user not found"}, status=status.HTTP_404_NOT_FOUND
-                    )
+            queryset = get_object_or_404(User, phone=serializer.data["phone"])
+            if OneTimePassword("reset_password", serializer.data["phone"]).verify(
+                serializer.data["otp_code"]
+            ):
+                queryset.set_password(serializer.data.get("new_password"))
+                queryset.save()
+                revoke_tokens(queryset.pk)
+                return Response(
+                    {"detail": "password successfully changed"},
+                    status=status.HTTP_200_OK,
+                )
             else:
                 return Response(
                     Errors.INVALID_OTP_CODE,
@@ -122,7 +125,36 @@ class OTPSendAPIView(generics.CreateAPIView):
     """
 
     def create(self, request):
-        serializer = self.serializer_class(data=request.data)
+        serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         result, status = serializer.set_cache()
         return Response(result, status)
+
+
+# View to check whether an OTP SMS was sent.
+class OTPStatusAPIView(APIView):
+    """
+    Clients poll this view with the request_id returned by the OTP send view.
+    The status is "pending" until the SMS panel answered, then "sent" or
+    "failed" (with a 502, so the user can ask for a new code). Unknown and
+    expired request ids are a 404.
+    """
+
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = "otp_status"
+
+    def get(self, request, request_id):
+        result = AsyncResult(str(request_id), app=send_otp.app)
+        # celery reports every id it has no state of as pending
+        if result.state == states.PENDING:
+            return Response(
+                Errors.OTP_REQUEST_NOT_FOUND, status=status.HTTP_404_NOT_FOUND
+            )
+        if not result.ready():
+            return Response({"status": "pending"}, status=status.HTTP_202_ACCEPTED)
+        if result.successful() and result.result:
+            return Response({"status": "sent"}, status=status.HTTP_200_OK)
+        return Response(
+            {**Errors.SMS_PANEL, "status": "failed"},
+            status=status.HTTP_502_BAD_GATEWAY,
+        )
@@ -0,0 +1,89 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from accounts.services.auth_state import get_auth_state, is_revoked
+
+
+class ClaimsUser(TokenUser):
+    """
+    The user of a JWT, built from its signed claims (user_id, phone, is_staff,
+    is_ban) instead of the User row. The cached auth state, when given,
+    overrides the flags so bans and staff changes apply before the token
+    expires. Views that change the user load the model themselves.
+    """
+
+    def __init__(self, token, state=None):
+        super().__init__(token)
+        self.state = state or {}
+
+    def __str__(self):
+        return self.phone
+
+    def get_username(self):
+        return self.phone
+
+    def flag(self, name):
+        return self.state.get(name, self.token.get(name, False))
+
+    @property
+    def phone(self):
+        return self.token.get("phone", "")
+
+    @property
+    def is_active(self):
+        return self.state.get("is_active", True)
+
+    @property
+    def is_staff(self):
+        return self.flag("is_staff")
+
+    @property
+    def is_superuser(self):
+        return self.flag("is_superuser")
+
+    @property
+    def is_ban(self):
+        return self.flag("is_ban")
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication without a User query per request. The token claims
+    make the user, only the short lived auth state (active, staff, ban and
+    token revocation) is read, from the cache.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        state, revoked_at = get_auth_state(user_id)
+        if not state:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not state["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if is_revoked(validated_token.get("iat", 0), revoked_at):
+            raise InvalidToken(_("Token has been revoked"))
+        return ClaimsUser(validated_token, state)
+
+
+# Authentication policy. DRF tries every class of a view on each request, the
+# ones without credentials too, and Basic auth hashes any password it is sent.
+# So the API only takes JWTs (REST_FRAMEWORK["DEFAULT_AUTHENTICATION_CLASSES"])
+# and a view that also serves token or basic auth lists it itself.
+API_AUTHENTICATION = [StatelessJWTAuthentication]
+# pages staff open in a browser (API docs), logged in through the admin
+BROWSER_AUTHENTICATION = [SessionAuthentication, StatelessJWTAuthentication]
+
+
+def api_authentication(*classes):
+    """
+    The authentication classes of a view that opts in to more schemes, e.g.
+    `authentication_classes = api_authentication(TokenAuthentication)`.
+    """
+    return [*API_AUTHENTICATION, *classes]
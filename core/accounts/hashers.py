@@ -0,0 +1,79 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.contrib.auth import hashers
+
+# Password hashes a process computes at once. The hashers release the GIL, so
+# with threaded gunicorn workers the remaining threads keep serving requests.
+_slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_CONCURRENCY)
+# seconds a hash waits for a slot, None blocks until one frees up
+_wait = ContextVar("password_hash_wait", default=None)
+
+
+class PasswordHashingBusy(Exception):
+    pass
+
+
+@contextmanager
+def hashing_wait(seconds):
+    """
+    Let the hashes in the block wait up to `seconds` for a slot and raise
+    PasswordHashingBusy after that, e.g. in API views. Outside of one (admin,
+    management commands) hashes wait as long as it takes.
+    """
+    token = _wait.set(seconds)
+    try:
+        yield
+    finally:
+        _wait.reset(token)
+
+
+# slots held by the thread, verify() of most hashers calls encode()
+_held = threading.local()
+
+
+@contextmanager
+def hashing_slot():
+    """
+    Hold one of the per process hashing slots, see hashing_wait. Nested calls
+    of a thread share the slot of the outermost one.
+    """
+    depth = getattr(_held, "depth", 0)
+    if not depth and not _slots.acquire(timeout=_wait.get()):
+        raise PasswordHashingBusy
+    _held.depth = depth + 1
+    try:
+        yield
+    finally:
+        _held.depth = depth
+        if not depth:
+            _slots.release()
+
+
+class LimitedHasherMixin:
+    """Hash and verify passwords in a slot of the per process limit."""
+
+    def encode(self, password, salt, *args, **kwargs):
+        with hashing_slot():
+            return super().encode(password, salt, *args, **kwargs)
+
+    def verify(self, password, encoded):
+        with hashing_slot():
+            return super().verify(password, encoded)
+
+
+class Argon2PasswordHasher(LimitedHasherMixin, hashers.Argon2PasswordHasher):
+    """
+    Argon2id with the costs of the ARGON2_* settings. A password hashed with
+    other costs (or by another hasher) is rehashed on the next login.
+    """
+
+    time_cost = settings.ARGON2_TIME_COST
+    memory_cost = settings.ARGON2_MEMORY_COST
+    parallelism = settings.ARGON2_PARALLELISM
+
+
+# Verifies the passwords hashed before Argon2, until they are rehashed.
+class PBKDF2PasswordHasher(LimitedHasherMixin, hashers.PBKDF2PasswordHasher):
+    pass
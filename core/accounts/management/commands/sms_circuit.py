@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from accounts.tasks import SMS_METHODS, get_circuit_breaker
+
+
+class Command(BaseCommand):
+    help = "Show the state of the SMS panel circuit breakers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="close the circuits first"
+        )
+
+    def handle(self, *args, **options):
+        for method in SMS_METHODS:
+            breaker = get_circuit_breaker(method)
+            if options["reset"]:
+                breaker.reset()
+            stats = " ".join(f"{key}={value}" for key, value in breaker.stats().items())
+            self.stdout.write(f"{breaker.name}: {stats}")
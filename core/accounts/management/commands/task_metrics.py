@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from utils import metrics
+
+
+def ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.0f}ms"
+
+
+class Command(BaseCommand):
+    help = "Show queue wait, runtime and SMS panel time of the celery tasks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="clear the metrics afterwards"
+        )
+
+    def handle(self, *args, **options):
+        waits = metrics.histograms("celery_task_queue_wait_seconds")
+        providers = metrics.histograms("celery_task_provider_seconds")
+        failures = metrics.counters("celery_task_failures_total")
+        runtimes = {}
+        for labels, histogram in metrics.histograms(
+            "celery_task_runtime_seconds"
+        ).items():
+            # all states of a task in one row
+            task = dict(labels)["task"]
+            row = runtimes.setdefault(task, {"buckets": {}, "sum": 0.0, "count": 0})
+            for bound, count in histogram["buckets"]:
+                row["buckets"][bound] = row["buckets"].get(bound, 0) + count
+            row["sum"] += histogram["sum"]
+            row["count"] += histogram["count"]
+
+        self.stdout.write(
+            f"{'task':40} {'count':>6} {'wait p50':>9} {'wait p95':>9} "
+            f"{'run p50':>9} {'run p95':>9} {'panel avg':>9} {'failed':>6}"
+        )
+        for task in sorted(runtimes):
+            run = dict(
+                runtimes[task], buckets=sorted(runtimes[task]["buckets"].items())
+            )
+            wait = waits.get((("task", task),), {"count": 0})
+            provider = providers.get((("task", task),))
+            failed = sum(
+                count
+                for labels, count in failures.items()
+                if dict(labels)["task"] == task
+            )
+            self.stdout.write(
+                f"{task:40} {run['count']:>6} "
+                f"{ms(metrics.quantile(wait, 0.5)):>9} "
+                f"{ms(metrics.quantile(wait, 0.95)):>9} "
+                f"{ms(metrics.quantile(run, 0.5)):>9} "
+                f"{ms(metrics.quantile(run, 0.95)):>9} "
+                f"{ms(provider and provider['sum'] / provider['count']):>9} "
+                f"{failed:>6}"
+            )
+        if options["reset"]:
+            metrics.reset()
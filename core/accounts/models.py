@@ -1,10 +1,12 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
 from django.contrib.auth.base_user import BaseUserManager
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
-from accounts.tasks import send_welcome
+from accounts.services.auth_state import forget_auth_state
+from accounts.tasks import process_avatar, send_welcome
+from outbox.relay import enqueue
 from validators.fieldvalidators import FieldValidators
 from validators.volumevalidator import VolumeValidator
 
@@ -82,6 +84,8 @@ class User(AbstractBaseUser, PermissionsMixin):
         blank=True,
         null=True,
     )
+    # URLs of the resized avatar, {size: {format: url}}, see process_avatar
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)
     languages = models.ManyToManyField("languages", blank=True)
     frameworks = models.ManyToManyField("frameworks", blank=True)
     is_staff = models.BooleanField(default=False)
@@ -115,8 +119,87 @@ class Frameworks(models.Model):
     def __str__(self):
         return self.name
 
+# Define a model to track the delivery of sent SMS messages.
+class SmsMessage(models.Model):
+    class Status(models.IntegerChoices):
+        PENDING = 0, _("Pending")
+        DELIVERED = 1, _("Delivered")
+        FAILED = 2, _("Failed")
+        EXPIRED = 3, _("Expired")
+
+    # delivery codes of the panel: 1 delivered to the phone, 2 not delivered to
+    # the phone, 3 telecom error, 5 unknown error, 16 not delivered to the
+    # operator, 35 blacklisted, 300 filtered, 500 rejected; the rest are pending
+    DELIVERED_CODES = {1}
+    FAILED_CODES = {2, 3, 5, 16, 35, 300, 500}
+
+    phone = models.CharField(max_length=11)
+    body_id = models.PositiveIntegerField(blank=True, null=True)
+    rec_id = models.BigIntegerField(blank=True, null=True)
+    status = models.PositiveSmallIntegerField(
+        choices=Status.choices, default=Status.PENDING
+    )
+    delivery_code = models.SmallIntegerField(blank=True, null=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+    updated_date = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # only the pending (Status.PENDING) rows are polled, keep them in a
+            # small index
+            models.Index(
+                fields=["id"],
+                condition=models.Q(status=0),
+                name="smsmessage_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.phone} ({self.get_status_display()})"
+
+    @classmethod
+    def status_of(cls, delivery_code):
+        if delivery_code in cls.DELIVERED_CODES:
+            return cls.Status.DELIVERED
+        if delivery_code in cls.FAILED_CODES:
+            return cls.Status.FAILED
+        return cls.Status.PENDING
+
 # Signal handler to create a user profile and send a welcome message on user creation.
+# The message is sent once the user is committed, through the outbox.
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
-        send_welcome.delay(instance.phone, instance.first_name)
+        enqueue(send_welcome, instance.phone, instance.first_name)
+
+# Signal handler to drop the cached auth state (staff, ban, active) of a changed user.
+@receiver([post_save, post_delete], sender=User)
+def forget_user_auth_state(sender, instance, **kwargs):
+    forget_auth_state(instance.pk)
+
+# Signal handlers to resize a new avatar once the user is committed, through the outbox.
+def stored_avatar(instance):
+    # the raw attribute, a deferred avatar is not loaded
+    value = instance.__dict__.get("avatar")
+    return getattr(value, "name", value) or ""
+
+@receiver(post_init, sender=User)
+def remember_avatar(sender, instance, **kwargs):
+    instance._stored_avatar = stored_avatar(instance)
+
+@receiver(pre_save, sender=User)
+def reset_avatar_variants(sender, instance, update_fields=None, **kwargs):
+    instance._avatar_changed = (
+        "avatar" in instance.__dict__
+        and (update_fields is None or "avatar" in update_fields)
+        and stored_avatar(instance) != instance._stored_avatar
+    )
+    if instance._avatar_changed:
+        instance.avatar_variants = {}
+
+@receiver(post_save, sender=User)
+def process_new_avatar(sender, instance, **kwargs):
+    if instance._avatar_changed:
+        replaced = instance._stored_avatar
+        instance._stored_avatar = stored_avatar(instance)
+        enqueue(process_avatar, instance.pk, instance._stored_avatar, replaced)
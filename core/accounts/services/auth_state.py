@@ -0,0 +1,51 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# the fields a stateless JWT request may need fresh, rather than as signed
+STATE_FIELDS = ("is_active", "is_staff", "is_superuser", "is_ban")
+
+
+def state_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def revoked_key(user_id):
+    return f"auth:revoked:{user_id}"
+
+
+def get_auth_state(user_id):
+    """
+    The STATE_FIELDS of a user and the time its tokens were revoked (or None),
+    from the cache in one round trip. A missed state is read from the database
+    and kept settings.AUTH_STATE_CACHE_TIME seconds, a deleted user as {}.
+    """
+    from accounts.models import User
+
+    cached = cache.get_many([state_key(user_id), revoked_key(user_id)])
+    state = cached.get(state_key(user_id))
+    if state is None:
+        state = User.objects.filter(pk=user_id).values(*STATE_FIELDS).first() or {}
+        cache.set(state_key(user_id), state, settings.AUTH_STATE_CACHE_TIME)
+    return state, cached.get(revoked_key(user_id))
+
+
+def is_revoked(issued_at, revoked_at):
+    # iat has whole seconds, so a token of the second tokens were revoked in
+    # may be older than the revocation and is rejected too
+    return revoked_at is not None and issued_at <= revoked_at
+
+
+def forget_auth_state(user_id):
+    """Drop the cached state of a user once the change is committed."""
+    transaction.on_commit(lambda: cache.delete(state_key(user_id)))
+
+
+def revoke_tokens(user_id):
+    """
+    Reject the tokens issued to a user until now, e.g. after a password change.
+    Kept as long as a refresh token lives.
+    """
+    lifetime = settings.SIMPLE_JWT["REFRESH_TOKEN_LIFETIME"]
+    cache.set(revoked_key(user_id), time.time(), int(lifetime.total_seconds()))
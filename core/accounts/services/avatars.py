@@ -0,0 +1,92 @@
+import os
+import re
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+VARIANTS_DIR = "avatars/variants"
+# format: (file extension, Pillow format, save options)
+FORMATS = {
+    "webp": ("webp", "WEBP", {"quality": 80, "method": 6}),
+    "jpeg": ("jpg", "JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def get_storage():
+    from accounts.models import User
+
+    return User._meta.get_field("avatar").storage
+
+
+def variant_dir(user_id):
+    return f"{VARIANTS_DIR}/{user_id}"
+
+
+def render_variants(file):
+    """
+    Square thumbnails of the image `file` for every settings.AVATAR_SIZES,
+    in every FORMATS, as {size: {format: bytes}}. The pixels are turned as the
+    EXIF orientation says, the EXIF itself (camera, location) is dropped.
+    """
+    largest = max(settings.AVATAR_SIZES.values())
+    with Image.open(file) as image:
+        # JPEGs are decoded at the smallest scale still larger than `largest`
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            # transparent avatars get a white background
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        image = image.convert("RGB")
+
+    variants = {}
+    for size, pixels in settings.AVATAR_SIZES.items():
+        thumbnail = ImageOps.fit(image, (pixels, pixels), Image.LANCZOS)
+        for name, (_, pillow_format, options) in FORMATS.items():
+            output = BytesIO()
+            thumbnail.save(output, pillow_format, **options)
+            variants.setdefault(size, {})[name] = output.getvalue()
+    return variants
+
+
+def save_variants(user_id, name):
+    """
+    Render and store the variants of the avatar file `name`, returns their
+    URLs as {size: {format: url}} and their storage paths.
+    """
+    storage = get_storage()
+    with storage.open(name) as file:
+        rendered = render_variants(file)
+    stem = os.path.splitext(os.path.basename(name))[0]
+    urls, paths = {}, []
+    for size, formats in rendered.items():
+        for image_format, content in formats.items():
+            extension = FORMATS[image_format][0]
+            path = storage.save(
+                f"{variant_dir(user_id)}/{stem}_{size}.{extension}",
+                ContentFile(content),
+            )
+            urls.setdefault(size, {})[image_format] = storage.url(path)
+            paths.append(path)
+    return urls, paths
+
+
+def delete_variants(user_id, name):
+    """Delete the stored variants of the avatar file `name` of a user."""
+    storage = get_storage()
+    try:
+        _, files = storage.listdir(variant_dir(user_id))
+    except FileNotFoundError:
+        return
+    # {stem}_{size}.{extension}, or with the 7 characters the storage appends
+    # to taken names, but not the variants of another avatar named {stem}_*
+    stem = re.escape(os.path.splitext(os.path.basename(name))[0])
+    sizes = "|".join(settings.AVATAR_SIZES)
+    extensions = "|".join(extension for extension, _, _ in FORMATS.values())
+    variant = re.compile(rf"{stem}_({sizes})(_[a-zA-Z0-9]{{7}})?\.({extensions})")
+    for file in files:
+        if variant.fullmatch(file):
+            storage.delete(f"{variant_dir(user_id)}/{file}")
@@ -0,0 +1,91 @@
+import secrets
+import time
+from django.conf import settings
+from django_redis import get_redis_connection
+
+# KEYS: code, phone window, ip window
+# ARGV: code, code ttl, now, window, phone limit, ip limit, request id
+# A code is issued only when none is pending and both sliding windows (sorted
+# sets of request timestamps) have room, all in one step, so two concurrent
+# requests can never send two SMS.
+ISSUE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+local window_start = tonumber(ARGV[3]) - tonumber(ARGV[4])
+for i, limit in ipairs({ARGV[5], ARGV[6]}) do
+    redis.call('ZREMRANGEBYSCORE', KEYS[i + 1], '-inf', window_start)
+    if redis.call('ZCARD', KEYS[i + 1]) >= tonumber(limit) then
+        return -1
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+for i = 2, 3 do
+    redis.call('ZADD', KEYS[i], ARGV[3], ARGV[7])
+    redis.call('EXPIRE', KEYS[i], ARGV[4])
+end
+return 1
+"""
+
+VERIFY_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class OTPRateLimited(Exception):
+    pass
+
+
+class OneTimePassword:
+    """
+    Redis backed one time codes of a phone for one `purpose` (register,
+    reset_password). A code lives settings.OTP_CODE_TIME seconds and is
+    consumed by the first successful verify. Issuing is limited per phone and
+    per client IP to settings.OTP_PHONE_LIMIT / OTP_IP_LIMIT codes in a sliding
+    window of settings.OTP_LIMIT_WINDOW seconds.
+    """
+
+    _scripts = {}
+
+    def __init__(self, purpose, phone):
+        self.purpose = purpose
+        self.phone = phone
+        self.key = f"otp:{purpose}:{phone}"
+        self.redis = get_redis_connection("default")
+
+    def _script(self, source):
+        if source not in self._scripts:
+            self._scripts[source] = self.redis.register_script(source)
+        return self._scripts[source]
+
+    def issue(self, ip):
+        """
+        Return a new code, or None while the previous one is still valid.
+        Raise OTPRateLimited when the phone or the ip used up its window.
+        """
+        code = f"{secrets.randbelow(9000) + 1000}"
+        result = self._script(ISSUE_SCRIPT)(
+            keys=[self.key, f"otp:limit:phone:{self.phone}", f"otp:limit:ip:{ip}"],
+            args=[
+                code,
+                settings.OTP_CODE_TIME,
+                time.time(),
+                settings.OTP_LIMIT_WINDOW,
+                settings.OTP_PHONE_LIMIT,
+                settings.OTP_IP_LIMIT,
+                secrets.token_hex(8),
+            ],
+        )
+        if result == -1:
+            raise OTPRateLimited
+        return code if result else None
+
+    def verify(self, code):
+        """Consume the code, False when it does not match or has expired."""
+        return bool(self._script(VERIFY_SCRIPT)(keys=[self.key], args=[str(code)]))
+
+    def revoke(self):
+        self.redis.delete(self.key)
@@ -1,32 +1,121 @@
+from collections import defaultdict
+from datetime import timedelta
+from functools import lru_cache
 from celery import shared_task
+from celery.utils import uuid
+from accounts.services.avatars import delete_variants, get_storage, save_variants
+from accounts.services.otp import OneTimePassword
 from adapter.melipayamak import Api
+from adapter.melipayamak.breaker import CircuitBreaker, CircuitBreakerClient
 from decouple import config
+from django.db.models import Q
+from django.utils import timezone
+from django_redis import get_redis_connection
+from utils.metrics import observe_provider
 
 username = config("MELIPAYAMAK_USERNAME", default="test")
 password = config("MELIPAYAMAK_PASSWORD", default="test")
+# sender line of plain text messages, pattern (bodyId) messages do not need one
+number = config("MELIPAYAMAK_NUMBER", default="")
+# recIds per GetDeliveries request
+DELIVERY_CHUNK_SIZE = 100
+# messages still pending after this are not polled anymore
+DELIVERY_TIMEOUT = timedelta(days=2)
 
 
-@shared_task
-def send_otp(phone, code):
-    api = Api(username, password)
-    sms_rest = api.sms()
+SMS_METHODS = ("rest", "soap")
+
+
+def get_circuit_breaker(_method):
+    return CircuitBreaker(
+        get_redis_connection("default"),
+        f"sms_{_method}",
+        failure_rate=config("SMS_CIRCUIT_FAILURE_RATE", cast=float, default=0.5),
+        min_calls=config("SMS_CIRCUIT_MIN_CALLS", cast=int, default=10),
+        reset_timeout=config("SMS_CIRCUIT_RESET_TIMEOUT", cast=int, default=30),
+        slow_call_time=config("SMS_CIRCUIT_SLOW_CALL_TIME", cast=float, default=5),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_sms_client(_method="rest"):
+    # One client (and keep-alive connection pool) per worker process, behind a
+    # circuit breaker shared by all workers. REST falls back to SOAP when it
+    # cannot reach the panel.
+    fallback = get_sms_client("soap") if _method == "rest" else None
+    return CircuitBreakerClient(
+        Api(username, password).sms(_method),
+        get_circuit_breaker(_method),
+        fallback,
+        on_call=observe_provider,
+    )
+
+
+def sent_rec_id(response):
+    """The recId of a message the panel accepted, None when it refused it."""
+    # REST answers with a json object, the SOAP fallback with the value itself
+    if isinstance(response, dict):
+        if response.get("RetStatus", 1) != 1:
+            return None
+        response = response.get("Value")
+    # refusals are short error codes, recIds have 15 digits or more
+    rec_id = str(response)
+    return int(rec_id) if len(rec_id) >= 15 and rec_id.isdigit() else None
+
+
+def record_sms(phone, body_id, response):
+    # accounts.models imports this module, import the model on use
+    from .models import SmsMessage
+
+    rec_id = sent_rec_id(response)
+    sent = rec_id is not None
+    SmsMessage.objects.create(
+        phone=phone,
+        body_id=body_id,
+        rec_id=rec_id,
+        status=SmsMessage.Status.PENDING if sent else SmsMessage.Status.FAILED,
+    )
+    return sent
+
+
+# Result state of an OTP request that no worker has picked up yet.
+OTP_QUEUED = "QUEUED"
+
+
+# The OTP send endpoint returns the task id, clients poll its result.
+@shared_task(ignore_result=False)
+def send_otp(phone, code, purpose=None):
+    sms_rest = get_sms_client()
     to = phone
     text = [
         f"{code}",
     ]
     bodyId = 115131
 
-    response = sms_rest.send_by_base_number(text, to, bodyId)
-    if len(response["Value"]) >= 15:
-        return True
-    else:
-        return False
+    sent = False
+    try:
+        response = sms_rest.send_by_base_number(text, to, bodyId)
+        sent = record_sms(to, bodyId, response)
+        return sent
+    finally:
+        if not sent and purpose:
+            # the code never arrived, let the user ask for a new one right away
+            OneTimePassword(purpose, phone).revoke()
+
+
+def queue_otp(phone, code, purpose):
+    """Queue send_otp and return its request id."""
+    # The state is stored before publishing (and expires with the results),
+    # so the status view can tell a queued request from an unknown one.
+    request_id = uuid()
+    send_otp.backend.store_result(request_id, None, OTP_QUEUED)
+    send_otp.apply_async((phone, code, purpose), task_id=request_id)
+    return request_id
 
 
 @shared_task
 def send_welcome(phone, first_name):
-    api = Api(username, password)
-    sms_rest = api.sms()
+    sms_rest = get_sms_client()
     to = phone
     text = [
         f"{first_name}",
@@ -34,7 +123,64 @@ def send_welcome(phone, first_name):
     bodyId = 115128
 
     response = sms_rest.send_by_base_number(text, to, bodyId)
-    if len(response["Value"]) >= 15:
-        return True
-    else:
-        return False
+    return record_sms(to, bodyId, response)
+
+
+@shared_task
+def process_avatar(user_id, name, replaced=""):
+    """
+    Store the resized WebP/JPEG variants of the avatar file `name` of a user
+    in User.avatar_variants, and delete those of the `replaced` avatar.
+    """
+    from .models import User
+
+    variants, paths = save_variants(user_id, name) if name else ({}, [])
+    avatar = Q(avatar=name) if name else Q(avatar="") | Q(avatar__isnull=True)
+    updated = User.objects.filter(avatar, pk=user_id).update(avatar_variants=variants)
+    if not updated:
+        # the avatar changed again meanwhile, its own task stores it
+        for path in paths:
+            get_storage().delete(path)
+    # only the files of the replaced avatar, a newer avatar's task may have
+    # stored its variants already
+    if replaced:
+        delete_variants(user_id, replaced)
+    return updated
+
+
+@shared_task
+def poll_sms_deliveries():
+    """
+    Update the status of pending messages from the panel, DELIVERY_CHUNK_SIZE
+    recIds per GetDeliveries request. Run periodically by celery beat.
+    """
+    from .models import SmsMessage
+
+    pending = SmsMessage.objects.filter(status=SmsMessage.Status.PENDING)
+    pending.filter(created_date__lt=timezone.now() - DELIVERY_TIMEOUT).update(
+        status=SmsMessage.Status.EXPIRED, updated_date=timezone.now()
+    )
+    soap = get_sms_client("soap")
+    last_id, updated = 0, 0
+    while True:
+        chunk = list(
+            pending.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "rec_id")[:DELIVERY_CHUNK_SIZE]
+        )
+        if not chunk:
+            return updated
+        last_id = chunk[-1][0]
+        codes = soap.is_delivered([rec_id for _, rec_id in chunk])
+
+        # one UPDATE per distinct delivery code of the chunk
+        ids_by_code = defaultdict(list)
+        for (pk, _), code in zip(chunk, codes):
+            if SmsMessage.status_of(code) != SmsMessage.Status.PENDING:
+                ids_by_code[code].append(pk)
+        for code, ids in ids_by_code.items():
+            updated += SmsMessage.objects.filter(pk__in=ids).update(
+                status=SmsMessage.status_of(code),
+                delivery_code=code,
+                updated_date=timezone.now(),
+            )
@@ -0,0 +1,110 @@
+from accounts.models import User
+from accounts.services.avatars import get_storage, save_variants
+from accounts.tasks import process_avatar
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from io import BytesIO
+from outbox.models import OutboxMessage
+from PIL import Image
+import shutil
+import tempfile
+
+
+def photo(name="avatar.jpg", size=(1600, 1200)):
+    # a noisy camera photo with an orientation tag and GPS-like metadata
+    image = Image.effect_noise(size, 60).convert("RGB")
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotated 90 degrees
+    exif[0x010F] = "camera"
+    output = BytesIO()
+    image.save(output, "JPEG", quality=95, exif=exif)
+    return SimpleUploadedFile(name, output.getvalue(), content_type="image/jpeg")
+
+
+class AvatarVariantsTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings = override_settings(MEDIA_ROOT=media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user(
+            phone="09123456789", password="test", first_name="test"
+        )
+        OutboxMessage.objects.all().delete()
+
+    def upload(self, file):
+        self.user.avatar = file
+        self.user.save()
+        return self.user.avatar.name
+
+    def test_avatar_change_is_enqueued(self):
+        name = self.upload(photo())
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.task, "accounts.tasks.process_avatar")
+        self.assertEqual(message.args, [self.user.pk, name, ""])
+
+        # saving other fields does not process the avatar again
+        self.user.first_name = "other"
+        self.user.save()
+        User.objects.get(pk=self.user.pk).save()
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+    def test_variants(self):
+        original = photo()
+        name = self.upload(original)
+        self.assertEqual(process_avatar(self.user.pk, name), 1)
+
+        self.user.refresh_from_db()
+        storage = get_storage()
+        self.assertEqual(set(self.user.avatar_variants), {"small", "medium", "large"})
+        for size, pixels in {"small": 64, "medium": 160, "large": 400}.items():
+            for image_format, pillow_format in {"webp": "WEBP", "jpeg": "JPEG"}.items():
+                url = self.user.avatar_variants[size][image_format]
+                path = url[len(storage.base_url) :]
+                with storage.open(path) as file:
+                    content = file.read()
+                image = Image.open(BytesIO(content))
+                self.assertEqual(image.format, pillow_format)
+                self.assertEqual(image.size, (pixels, pixels))
+                self.assertFalse(image.getexif())
+                self.assertLess(len(content), original.size / 4)
+
+    def process_enqueued(self):
+        message = OutboxMessage.objects.latest("pk")
+        return process_avatar(*message.args)
+
+    def variant_files(self):
+        _, files = get_storage().listdir(f"avatars/variants/{self.user.pk}")
+        return files
+
+    def test_replaced_avatar_drops_old_variants(self):
+        first = self.upload(photo("first.jpg"))
+        self.process_enqueued()
+        self.upload(photo("second.jpg", size=(500, 500)))
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar_variants, {})
+        # the late task of the first avatar stores nothing
+        self.assertEqual(process_avatar(self.user.pk, first), 0)
+        self.assertEqual(self.process_enqueued(), 1)
+
+        files = self.variant_files()
+        self.assertEqual(len(files), 6)
+        self.assertTrue(all(file.startswith("second_") for file in files))
+
+    def test_newer_variants_are_kept(self):
+        self.upload(photo("first.jpg"))
+        self.process_enqueued()
+        # first_1 is not a variant of first
+        self.upload(photo("first_1.jpg"))
+        # the task of a newer avatar stored its files before this one ended
+        third = get_storage().save("avatars/third.jpg", photo("third.jpg"))
+        save_variants(self.user.pk, third)
+
+        self.assertEqual(self.process_enqueued(), 1)
+        files = self.variant_files()
+        self.assertEqual(len(files), 12)
+        self.assertEqual(len([file for file in files if file.startswith("third_")]), 6)
+        self.assertFalse(any(file.startswith("first_small") for file in files))
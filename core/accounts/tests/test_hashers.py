@@ -0,0 +1,112 @@
+from accounts import hashers
+from accounts.models import User
+from django.contrib.auth import hashers as django_hashers
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from unittest import mock
+import threading
+
+
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            phone="09123456789",
+            password="password",
+            first_name="test",
+            last_name="test",
+        )
+
+    def login(self):
+        return self.client.post(
+            reverse("accounts:jwt_obtain_pair"),
+            {"phone": "09123456789", "password": "password"},
+        )
+
+    def password_params(self):
+        self.user.refresh_from_db()
+        return identify_hasher(self.user.password).decode(self.user.password)
+
+    def test_argon2_with_configured_costs(self):
+        params = self.password_params()
+        self.assertEqual(params["algorithm"], "argon2")
+        self.assertEqual(
+            params["memory_cost"], hashers.Argon2PasswordHasher.memory_cost
+        )
+        self.assertEqual(params["time_cost"], hashers.Argon2PasswordHasher.time_cost)
+
+    def test_old_hashes_are_rehashed_on_login(self):
+        self.user.password = make_password("password", hasher="pbkdf2_sha256")
+        self.user.save()
+
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.password_params()["algorithm"], "argon2")
+
+    def test_changed_costs_rehash_on_login(self):
+        with mock.patch.object(hashers.Argon2PasswordHasher, "memory_cost", 8 * 1024):
+            self.assertEqual(self.login().status_code, 200)
+            self.assertEqual(self.password_params()["memory_cost"], 8 * 1024)
+
+    @override_settings(PASSWORD_HASH_WAIT=0)
+    def test_busy_hashers_answer_429(self):
+        for _ in range(2):
+            hashers._slots.acquire()
+        self.addCleanup(lambda: [hashers._slots.release() for _ in range(2)])
+
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1")
+
+    @override_settings(PASSWORD_HASH_WAIT=0)
+    def test_busy_hashers_block_outside_api_views(self):
+        # e.g. the admin login or createsuperuser
+        for _ in range(2):
+            hashers._slots.acquire()
+        hashed = []
+        thread = threading.Thread(target=lambda: hashed.append(make_password("x")))
+        thread.start()
+
+        thread.join(timeout=0.2)
+        self.assertTrue(thread.is_alive())
+        for _ in range(2):
+            hashers._slots.release()
+        thread.join()
+        self.assertEqual(len(hashed), 1)
+
+    def test_old_hashes_verify_in_one_slot(self):
+        # PBKDF2PasswordHasher.verify() encodes the password again
+        encoded = make_password("password", hasher="pbkdf2_sha256")
+
+        with mock.patch.object(hashers, "_slots", threading.BoundedSemaphore(1)):
+            with hashers.hashing_wait(0):
+                self.assertTrue(check_password("password", encoded))
+
+    def test_concurrent_old_hashes_do_not_deadlock(self):
+        encoded = make_password("password", hasher="pbkdf2_sha256")
+        # both threads hold their slot before encoding
+        barrier = threading.Barrier(2, timeout=5)
+        encode = django_hashers.PBKDF2PasswordHasher.encode
+
+        def waiting_encode(*args, **kwargs):
+            barrier.wait()
+            return encode(*args, **kwargs)
+
+        results = []
+
+        def verify():
+            try:
+                with hashers.hashing_wait(1):
+                    results.append(check_password("password", encoded))
+            except hashers.PasswordHashingBusy as e:
+                results.append(e)
+
+        with mock.patch.object(hashers, "_slots", threading.BoundedSemaphore(2)):
+            with mock.patch.object(
+                django_hashers.PBKDF2PasswordHasher, "encode", waiting_encode
+            ):
+                threads = [threading.Thread(target=verify) for _ in range(2)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        self.assertEqual(results, [True, True])
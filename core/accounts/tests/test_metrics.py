@@ -0,0 +1,133 @@
+from accounts.tests.test_sms_circuit import FakePanel
+from adapter.melipayamak.breaker import CircuitBreaker, CircuitBreakerClient
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django_redis import get_redis_connection
+from types import SimpleNamespace
+from unittest import mock
+from utils import metrics
+import time
+
+
+@shared_task
+def sleepy(seconds):
+    time.sleep(seconds)
+
+
+@shared_task
+def broken():
+    raise ValueError
+
+
+class TaskMetricsTests(SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def histogram(self, name, **labels):
+        return metrics.histograms(name)[tuple(sorted(labels.items()))]
+
+    def test_runtime(self):
+        sleepy.apply(args=(0.03,))
+        sleepy.apply(args=(0.03,))
+
+        histogram = self.histogram(
+            "celery_task_runtime_seconds", task=sleepy.name, state="SUCCESS"
+        )
+        self.assertEqual(histogram["count"], 2)
+        self.assertGreaterEqual(histogram["sum"], 0.06)
+        # cumulative buckets
+        self.assertEqual(dict(histogram["buckets"])[0.025], 0)
+        self.assertEqual(dict(histogram["buckets"])[0.05], 2)
+        self.assertEqual(dict(histogram["buckets"])[float("inf")], 2)
+        self.assertTrue(0.025 < metrics.quantile(histogram, 0.5) <= 0.05)
+
+    def test_failures(self):
+        broken.apply()
+
+        self.assertEqual(
+            metrics.counters("celery_task_failures_total"),
+            {(("exception", "ValueError"), ("task", broken.name)): 1},
+        )
+        self.histogram("celery_task_runtime_seconds", task=broken.name, state="FAILURE")
+
+    def test_queue_wait(self):
+        headers = {}
+        metrics.stamp_published_at(headers=headers)
+        request = SimpleNamespace(published_at=headers["published_at"] - 2, eta=None)
+        task = SimpleNamespace(name="test", request=request)
+        metrics.task_started(task_id="1", task=task)
+        # a retry waits for its eta first
+        request.eta = "2000-01-01T00:00:00+00:00"
+        metrics.task_started(task_id="2", task=task)
+
+        histogram = self.histogram("celery_task_queue_wait_seconds", task="test")
+        self.assertEqual(histogram["count"], 2)
+        self.assertEqual(dict(histogram["buckets"])[1], 0)
+        self.assertEqual(dict(histogram["buckets"])[2.5], 2)
+
+    def test_provider_time_of_task(self):
+        panel = FakePanel().__enter__()
+        self.addCleanup(panel.__exit__)
+        panel.handler.delay = 0.03
+        breaker = CircuitBreaker(get_redis_connection("default"), "test")
+        self.addCleanup(breaker.reset)
+        client = CircuitBreakerClient(
+            panel.client(), breaker, on_call=metrics.observe_provider
+        )
+
+        @shared_task
+        def send():
+            client.send_by_base_number(["1234"], "09000000000", 1)
+            client.send_by_base_number(["1234"], "09000000000", 1)
+
+        send.apply()
+
+        calls = self.histogram(
+            "sms_provider_call_seconds",
+            provider="test",
+            method="send_by_base_number",
+        )
+        self.assertEqual(calls["count"], 2)
+        provider = self.histogram("celery_task_provider_seconds", task=send.name)
+        self.assertEqual(provider["count"], 1)
+        self.assertAlmostEqual(provider["sum"], calls["sum"])
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        sleepy.apply(args=(0,))
+
+    def test_prometheus_format(self):
+        user = get_user_model().objects.create_superuser(
+            phone="09000000000", password="test"
+        )
+        self.client.force_login(user)
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn("# TYPE celery_task_runtime_seconds histogram", body)
+        self.assertIn(
+            'celery_task_runtime_seconds_count{task="%s",state="SUCCESS"} 1'
+            % sleepy.name,
+            body,
+        )
+        self.assertIn('sms_circuit_state{circuit="sms_rest",state="closed"}', body)
+
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        with mock.patch("core.views.METRICS_TOKEN", "secret"):
+            response = self.client.get(
+                reverse("metrics"), HTTP_AUTHORIZATION="Bearer wrong"
+            )
+            self.assertEqual(response.status_code, 403)
+            response = self.client.get(
+                reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret"
+            )
+            self.assertEqual(response.status_code, 200)
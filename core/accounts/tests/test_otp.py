@@ -0,0 +1,116 @@
+from accounts.services.otp import OneTimePassword, OTPRateLimited
+from accounts.tasks import OTP_QUEUED, send_otp
+from concurrent.futures import ThreadPoolExecutor
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from unittest import mock
+import uuid
+
+
+@override_settings(OTP_PHONE_LIMIT=3, OTP_IP_LIMIT=5, OTP_LIMIT_WINDOW=60)
+class OneTimePasswordTests(SimpleTestCase):
+    def otp(self, phone="09000000000", purpose="register"):
+        otp = OneTimePassword(purpose, phone)
+        keys = [otp.key, f"otp:limit:phone:{phone}", "otp:limit:ip:127.0.0.1"]
+        self.addCleanup(otp.redis.delete, *keys)
+        return otp
+
+    def test_code_is_consumed_by_verify(self):
+        otp = self.otp()
+        code = otp.issue("127.0.0.1")
+
+        self.assertFalse(otp.verify("0000"))
+        self.assertTrue(otp.verify(code))
+        self.assertFalse(otp.verify(code))
+
+    def test_purposes_do_not_share_codes(self):
+        code = self.otp().issue("127.0.0.1")
+        self.assertFalse(self.otp(purpose="reset_password").verify(code))
+
+    def test_no_new_code_while_one_is_pending(self):
+        otp = self.otp()
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            codes = list(pool.map(lambda _: otp.issue("127.0.0.1"), range(10)))
+
+        self.assertEqual(len([code for code in codes if code]), 1)
+
+    def test_phone_limit(self):
+        otp = self.otp()
+        for _ in range(3):
+            otp.revoke()
+            self.assertIsNotNone(otp.issue("127.0.0.1"))
+        otp.revoke()
+        with self.assertRaises(OTPRateLimited):
+            otp.issue("127.0.0.1")
+
+    def test_ip_limit(self):
+        for i in range(5):
+            self.assertIsNotNone(self.otp(phone=f"0900000000{i}").issue("127.0.0.1"))
+        with self.assertRaises(OTPRateLimited):
+            self.otp(phone="09000000009").issue("127.0.0.1")
+
+
+class OTPSendStatusAPITests(TestCase):
+    def setUp(self):
+        self.backend = send_otp.app.backend
+
+    def status_of(self, request_id):
+        return self.client.get(reverse("accounts:otp_status", args=[request_id]))
+
+    def test_send_returns_request_id(self):
+        otp = OneTimePassword("register", "09123456789")
+        self.addCleanup(
+            otp.redis.delete,
+            otp.key,
+            "otp:limit:phone:09123456789",
+            "otp:limit:ip:127.0.0.1",
+        )
+        with mock.patch.object(send_otp, "apply_async") as apply_async:
+            response = self.client.post(
+                reverse("accounts:otp_register_send"),
+                {"phone": "09123456789", "otp_type": "register_otp"},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        request_id = response.json()["request_id"]
+        self.addCleanup(self.backend.forget, request_id)
+        self.assertEqual(apply_async.call_args.kwargs["task_id"], request_id)
+        self.assertTrue(otp.verify(apply_async.call_args.args[0][1]))
+        # queued, not picked up by a worker yet
+        response = self.status_of(request_id)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["status"], "pending")
+
+    def test_pending(self):
+        request_id = str(uuid.uuid4())
+        self.backend.store_result(request_id, None, OTP_QUEUED)
+        self.addCleanup(self.backend.forget, request_id)
+        response = self.status_of(request_id)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["status"], "pending")
+
+    def test_unknown_or_expired(self):
+        response = self.status_of(uuid.uuid4())
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_sent(self):
+        request_id = str(uuid.uuid4())
+        self.backend.mark_as_done(request_id, True)
+        self.addCleanup(self.backend.forget, request_id)
+        response = self.status_of(request_id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "sent")
+
+    def test_failed(self):
+        rejected, crashed = str(uuid.uuid4()), str(uuid.uuid4())
+        self.backend.mark_as_done(rejected, False)
+        self.backend.mark_as_failure(crashed, ConnectionError())
+        for request_id in (rejected, crashed):
+            self.addCleanup(self.backend.forget, request_id)
+            response = self.status_of(request_id)
+
+            self.assertEqual(response.status_code, 502)
+            self.assertEqual(response.json()["status"], "failed")
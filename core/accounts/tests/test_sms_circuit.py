@@ -0,0 +1,146 @@
+from adapter.melipayamak.breaker import (
+    CircuitBreaker,
+    CircuitBreakerClient,
+    CircuitOpenError,
+)
+from adapter.melipayamak.sms import Rest
+from benchmarks.stub_server import StubHandler, StubServer
+from django.test import SimpleTestCase
+from django_redis import get_redis_connection
+import requests
+import socket
+import time
+
+
+class FakePanel(StubServer):
+    """The stub panel on its own handler class, to inject latency and errors."""
+
+    def __init__(self):
+        self.handler = type("FakePanelHandler", (StubHandler,), {})
+        super().__init__(self.handler)
+
+    def client(self):
+        # no urllib3 retries, every request is one call of the breaker
+        client = Rest("test", "test", session=requests.Session())
+        client.PATH = self.url + "/api/SendSMS/%s"
+        return client
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker(
+            get_redis_connection("default"),
+            "test",
+            min_calls=4,
+            reset_timeout=0.5,
+            slow_call_time=0.2,
+        )
+        self.breaker.reset()
+        self.addCleanup(self.breaker.reset)
+        self.panel = FakePanel().__enter__()
+        self.addCleanup(self.panel.__exit__)
+        self.client = CircuitBreakerClient(self.panel.client(), self.breaker)
+
+    def send(self):
+        return self.client.send_by_base_number(["1234"], "09000000000", 1)
+
+    def test_errors_open_the_circuit(self):
+        self.panel.handler.status = 500
+        for _ in range(4):
+            with self.assertRaises(requests.HTTPError):
+                self.send()
+        self.assertEqual(self.breaker.state(), CircuitBreaker.OPEN)
+
+        # fails fast, the panel is not called anymore
+        self.panel.handler.status = 200
+        with self.assertRaises(CircuitOpenError):
+            self.send()
+        self.assertEqual(self.breaker.stats()["total_calls"], 4)
+
+    def test_slow_calls_open_the_circuit(self):
+        self.panel.handler.delay = 0.3
+        for _ in range(4):
+            self.assertEqual(self.send()["RetStatus"], 1)
+        self.assertEqual(self.breaker.state(), CircuitBreaker.OPEN)
+
+    def test_half_open_probe(self):
+        self.panel.handler.status = 500
+        for _ in range(4):
+            with self.assertRaises(requests.HTTPError):
+                self.send()
+
+        # a failed probe opens the circuit again
+        time.sleep(0.5)
+        self.assertEqual(self.breaker.state(), CircuitBreaker.HALF_OPEN)
+        with self.assertRaises(requests.HTTPError):
+            self.send()
+        self.assertEqual(self.breaker.state(), CircuitBreaker.OPEN)
+
+        # a successful one closes it
+        time.sleep(0.5)
+        self.panel.handler.status = 200
+        self.send()
+        self.assertEqual(self.breaker.state(), CircuitBreaker.CLOSED)
+        self.assertEqual(self.breaker.stats()["times_opened"], 1)
+
+    def test_one_probe_at_a_time(self):
+        self.panel.handler.status = 500
+        for _ in range(4):
+            with self.assertRaises(requests.HTTPError):
+                self.send()
+        time.sleep(0.5)
+
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+
+    def test_late_results_do_not_close(self):
+        # a call let through before the circuit opened ends after it did
+        late = self.breaker.allow()
+        for _ in range(4):
+            self.breaker.record(True)
+        self.assertEqual(self.breaker.record(False, late), CircuitBreaker.OPEN)
+
+        # and after the probe was admitted, only the probe decides
+        time.sleep(0.5)
+        probe = self.breaker.allow()
+        self.assertEqual(self.breaker.record(False, late), CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.state(), CircuitBreaker.HALF_OPEN)
+        self.assertEqual(self.breaker.record(False, probe), CircuitBreaker.CLOSED)
+        self.assertEqual(self.breaker.stats()["total_calls"], 7)
+
+    def use_fallback(self):
+        fallback_panel = FakePanel().__enter__()
+        self.addCleanup(fallback_panel.__exit__)
+        self.client.fallback = fallback_panel.client()
+        return fallback_panel
+
+    def test_fallback(self):
+        self.use_fallback()
+        # nothing listens on the panel port anymore
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        self.client.client.PATH = f"http://127.0.0.1:{port}/api/SendSMS/%s"
+
+        for _ in range(5):
+            self.assertEqual(self.send()["RetStatus"], 1)
+        self.assertEqual(self.breaker.state(), CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.stats()["total_calls"], 4)
+
+    def test_no_fallback_once_sent(self):
+        self.use_fallback()
+        self.client.client.timeout = (1, 0.1)
+        self.panel.handler.delay = 0.3
+        # the panel may have accepted it, sending it again could duplicate it
+        with self.assertRaises(requests.ReadTimeout):
+            self.send()
+        self.panel.handler.delay = 0
+        self.panel.handler.status = 500
+        with self.assertRaises(requests.HTTPError):
+            self.send()
+
+        # once the circuit is open nothing was sent, the fallback is used
+        for _ in range(2):
+            with self.assertRaises(requests.HTTPError):
+                self.send()
+        self.assertEqual(self.send()["RetStatus"], 1)
@@ -0,0 +1,52 @@
+from adapter.melipayamak.sms import Rest
+from adapter.melipayamak.sms.rest import RETRY, get_session
+from benchmarks.stub_server import StubHandler, StubServer
+from django.test import SimpleTestCase
+from urllib3.exceptions import NewConnectionError
+import requests
+
+
+class CountingHandler(StubHandler):
+    requests = 0
+
+    def do_POST(self):
+        type(self).requests += 1
+        super().do_POST()
+
+
+class RestRetryTests(SimpleTestCase):
+    def setUp(self):
+        self.handler = type("PanelHandler", (CountingHandler,), {})
+        self.panel = StubServer(self.handler).__enter__()
+        self.addCleanup(self.panel.__exit__)
+        # a fresh pool with the module's adapter and retry policy
+        session = requests.Session()
+        for prefix, adapter in get_session().adapters.items():
+            session.mount(prefix, adapter)
+        self.client = Rest("test", "test", session=session, timeout=(1, 0.2))
+        self.client.PATH = self.panel.url + "/api/SendSMS/%s"
+
+    def send(self):
+        return self.client.send("09000000000", "1234", "text")
+
+    def test_gateway_errors_are_not_resent(self):
+        self.handler.status = 503
+        with self.assertRaises(requests.HTTPError):
+            self.send()
+        self.assertEqual(self.handler.requests, 1)
+
+    def test_only_connects_are_retried(self):
+        self.assertEqual((RETRY.read, RETRY.status, RETRY.other), (0, 0, 0))
+        self.assertFalse(RETRY.status_forcelist)
+        self.assertNotIn("POST", RETRY.allowed_methods)
+
+    def test_read_timeouts_are_not_resent(self):
+        self.handler.delay = 0.5
+        with self.assertRaises(requests.ReadTimeout):
+            self.send()
+        self.assertEqual(self.handler.requests, 1)
+
+    def test_failed_connects_are_retried(self):
+        error = NewConnectionError(None, "refused")
+        retry = RETRY.increment(method="POST", url="/", error=error)
+        self.assertEqual(retry.connect, RETRY.connect - 1)
@@ -0,0 +1,72 @@
+from adapter.melipayamak import clients
+from adapter.melipayamak.sms import SoapAsync
+from benchmarks.sms_soap import WSDL
+from django.test import SimpleTestCase
+from unittest import mock
+from zeep.transports import Transport
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import zeep
+
+SEND_URL = "http://api.payamak-panel.com/post/send.asmx?wsdl"
+
+
+class BundledWsdlTests(SimpleTestCase):
+    def setUp(self):
+        self.wsdl_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.wsdl_dir)
+        for patcher in (
+            mock.patch.object(clients, "WSDL_DIR", self.wsdl_dir),
+            mock.patch.dict(clients._clients, clear=True),
+            # no cache, a cached remote copy would hide a download
+            mock.patch.object(clients, "_transport", Transport(cache=None)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch(
+            "zeep.transports.Transport._load_remote_data",
+            side_effect=AssertionError("the WSDL was downloaded"),
+        )
+        self.remote = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_bundled_wsdl_is_not_downloaded(self):
+        with open(os.path.join(self.wsdl_dir, "send.wsdl"), "w") as f:
+            f.write(WSDL % "http://api.payamak-panel.com")
+
+        client = clients.get_client(SEND_URL)
+        self.assertTrue(hasattr(client.service, "GetCredit"))
+        self.assertIs(clients.get_client(SEND_URL), client)
+        self.remote.assert_not_called()
+
+    def test_missing_wsdl_is_downloaded(self):
+        with self.assertRaisesMessage(AssertionError, "the WSDL was downloaded"):
+            clients.get_client(SEND_URL)
+
+
+class AsyncClientTests(SimpleTestCase):
+    def test_wsdl_is_loaded_off_the_event_loop(self):
+        path = os.path.join(tempfile.mkdtemp(), "send.wsdl")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write(WSDL % "http://api.payamak-panel.com")
+        threads = []
+
+        def get_client(url):
+            threads.append(threading.current_thread())
+            return zeep.Client(path)
+
+        async def main():
+            async with SoapAsync("test", "test") as soap:
+                client = await soap.get_async_client(soap.sendUrl)
+                self.assertIs(await soap.get_async_client(soap.sendUrl), client)
+                return client
+
+        with mock.patch("adapter.melipayamak.session.get_client", get_client):
+            client = asyncio.run(main())
+        self.assertTrue(hasattr(client.service, "GetCredit"))
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
@@ -0,0 +1,84 @@
+from accounts import tasks
+from accounts.services.otp import OneTimePassword
+from accounts.models import SmsMessage
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from unittest import mock
+
+
+class SmsTasksTests(TestCase):
+    def setUp(self):
+        self.soap = mock.Mock()
+        # the panel answers with one delivery code per recId
+        self.soap.is_delivered.side_effect = lambda rec_ids: [
+            rec_id % 3 for rec_id in rec_ids
+        ]
+        patcher = mock.patch.object(tasks, "get_sms_client", return_value=self.soap)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_record_sms(self):
+        self.assertTrue(
+            tasks.record_sms("09000000000", 1, {"Value": "1234567890123456"})
+        )
+        self.assertFalse(tasks.record_sms("09000000001", 1, {"Value": "11"}))
+
+        self.assertEqual(
+            list(SmsMessage.objects.order_by("id").values_list("rec_id", "status")),
+            [
+                (1234567890123456, SmsMessage.Status.PENDING),
+                (None, SmsMessage.Status.FAILED),
+            ],
+        )
+
+    def test_pending_messages_are_polled_in_chunks(self):
+        SmsMessage.objects.bulk_create(
+            SmsMessage(phone="09000000000", rec_id=rec_id) for rec_id in range(250)
+        )
+        with mock.patch.object(tasks, "DELIVERY_CHUNK_SIZE", 100):
+            updated = tasks.poll_sms_deliveries()
+
+        self.assertEqual(self.soap.is_delivered.call_count, 3)
+        self.assertEqual(updated, 166)
+        for code, status in [
+            (0, SmsMessage.Status.PENDING),
+            (1, SmsMessage.Status.DELIVERED),
+            (2, SmsMessage.Status.FAILED),
+        ]:
+            messages = SmsMessage.objects.filter(rec_id__in=range(code, 250, 3))
+            self.assertEqual(set(messages.values_list("status", flat=True)), {status})
+
+        # only the still pending messages are polled again
+        self.soap.is_delivered.reset_mock()
+        tasks.poll_sms_deliveries()
+        self.assertEqual(
+            sum(len(call.args[0]) for call in self.soap.is_delivered.call_args_list),
+            84,
+        )
+
+    def test_old_pending_messages_expire(self):
+        message = SmsMessage.objects.create(phone="09000000000", rec_id=3)
+        SmsMessage.objects.filter(pk=message.pk).update(
+            created_date=timezone.now() - tasks.DELIVERY_TIMEOUT - timedelta(hours=1)
+        )
+        tasks.poll_sms_deliveries()
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, SmsMessage.Status.EXPIRED)
+        self.soap.is_delivered.assert_not_called()
+
+    def test_failed_otp_is_revoked(self):
+        otp = OneTimePassword("register", "09000000000")
+        self.addCleanup(
+            otp.redis.delete,
+            otp.key,
+            "otp:limit:phone:09000000000",
+            "otp:limit:ip:127.0.0.1",
+        )
+        code = otp.issue("127.0.0.1")
+        self.soap.send_by_base_number.return_value = {"Value": "11"}
+        self.assertFalse(tasks.send_otp("09000000000", code, "register"))
+
+        self.assertFalse(otp.verify(code))
+        self.assertIsNotNone(otp.issue("127.0.0.1"))
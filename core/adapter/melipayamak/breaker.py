@@ -0,0 +1,236 @@
+import time
+import uuid
+from functools import wraps
+import requests
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from zeep.exceptions import Fault, TransportError
+
+# The state of a circuit is one Redis hash, shared by every worker:
+# window_start/calls/failures  counters of the current window
+# opened_at                     set while the circuit is open or half open
+# probe_at/probe                start and token of the running half open probe
+# total_*/times_opened          lifetime counters, for metrics
+ALLOW_SCRIPT = """
+local opened_at = tonumber(redis.call('HGET', KEYS[1], 'opened_at') or '')
+if not opened_at then
+    return 1
+end
+local now = tonumber(ARGV[1])
+if now - opened_at < tonumber(ARGV[2]) then
+    return 0
+end
+local probe_at = tonumber(redis.call('HGET', KEYS[1], 'probe_at') or '0')
+if now - probe_at < tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'probe_at', ARGV[1], 'probe', ARGV[4])
+return 2
+"""
+
+RECORD_SCRIPT = """
+local now = tonumber(ARGV[1])
+local failed = ARGV[2] == '1'
+redis.call('HINCRBY', KEYS[1], 'total_calls', 1)
+if failed then
+    redis.call('HINCRBY', KEYS[1], 'total_failures', 1)
+end
+if redis.call('HEXISTS', KEYS[1], 'opened_at') == 1 then
+    -- only the admitted half open probe decides, calls let through before
+    -- the circuit opened (or a probe given up on) are just counted
+    if ARGV[6] == '' or redis.call('HGET', KEYS[1], 'probe') ~= ARGV[6] then
+        return 'open'
+    end
+    if failed then
+        redis.call('HSET', KEYS[1], 'opened_at', ARGV[1])
+        redis.call('HDEL', KEYS[1], 'probe_at', 'probe')
+        return 'open'
+    end
+    redis.call('HDEL', KEYS[1], 'opened_at', 'probe_at', 'probe')
+    redis.call('HSET', KEYS[1], 'window_start', ARGV[1], 'calls', 0, 'failures', 0)
+    return 'closed'
+end
+local window_start = tonumber(redis.call('HGET', KEYS[1], 'window_start') or '0')
+if now - window_start >= tonumber(ARGV[3]) then
+    redis.call('HSET', KEYS[1], 'window_start', ARGV[1], 'calls', 0, 'failures', 0)
+end
+local calls = redis.call('HINCRBY', KEYS[1], 'calls', 1)
+local failures = tonumber(redis.call('HGET', KEYS[1], 'failures') or '0')
+if failed then
+    failures = redis.call('HINCRBY', KEYS[1], 'failures', 1)
+end
+if calls >= tonumber(ARGV[4]) and failures / calls >= tonumber(ARGV[5]) then
+    redis.call('HSET', KEYS[1], 'opened_at', ARGV[1])
+    redis.call('HINCRBY', KEYS[1], 'times_opened', 1)
+    return 'open'
+end
+return 'closed'
+"""
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def sent_nothing(error):
+    """True when a call failed before the request reached the panel."""
+    if isinstance(error, (CircuitOpenError, requests.ConnectTimeout)):
+        return True
+    if not isinstance(error, requests.ConnectionError) or not error.args:
+        return False
+    # refused or unresolvable, not a connection dropped after sending
+    reason = getattr(error.args[0], "reason", None)
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+class CircuitBreaker:
+    """
+    Failure rate breaker of the SMS panel with its state in Redis.
+
+    Calls slower than `slow_call_time` count as failures. Once `failure_rate`
+    of at least `min_calls` calls in a `window` failed the circuit opens and
+    every call fails fast for `reset_timeout` seconds. Then it is half open:
+    one probe call at a time is let through, its success closes the circuit
+    and its failure opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+    errors = (requests.RequestException, ValueError, Fault, TransportError)
+
+    def __init__(
+        self,
+        redis,
+        name,
+        failure_rate=0.5,
+        min_calls=10,
+        window=60,
+        reset_timeout=30,
+        slow_call_time=5,
+    ):
+        self.redis = redis
+        self.name = name
+        self.key = f"sms:circuit:{name}"
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.slow_call_time = slow_call_time
+        self._scripts = {}
+
+    def _script(self, source):
+        if source not in self._scripts:
+            self._scripts[source] = self.redis.register_script(source)
+        return self._scripts[source]
+
+    def allow(self):
+        """
+        None while the circuit is open or another probe is running, else the
+        ticket to pass to `record`: True, or the token of a half open probe.
+        """
+        # a probe that never reports back is given up after one slow call
+        token = uuid.uuid4().hex
+        allowed = self._script(ALLOW_SCRIPT)(
+            keys=[self.key],
+            args=[time.time(), self.reset_timeout, self.slow_call_time, token],
+        )
+        if not allowed:
+            return None
+        return token if allowed == 2 else True
+
+    def record(self, failed, ticket=True):
+        """Record the result of a call, returns the state it leaves."""
+        state = self._script(RECORD_SCRIPT)(
+            keys=[self.key],
+            args=[
+                time.time(),
+                int(failed),
+                self.window,
+                self.min_calls,
+                self.failure_rate,
+                ticket if isinstance(ticket, str) else "",
+            ],
+        )
+        return state.decode() if isinstance(state, bytes) else state
+
+    def state(self):
+        opened_at = self.redis.hget(self.key, "opened_at")
+        if opened_at is None:
+            return self.CLOSED
+        if time.time() - float(opened_at) < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def stats(self):
+        values = {
+            key.decode(): float(value)
+            for key, value in self.redis.hgetall(self.key).items()
+        }
+        return {
+            "state": self.state(),
+            "calls": int(values.get("calls", 0)),
+            "failures": int(values.get("failures", 0)),
+            "total_calls": int(values.get("total_calls", 0)),
+            "total_failures": int(values.get("total_failures", 0)),
+            "times_opened": int(values.get("times_opened", 0)),
+            "opened_at": values.get("opened_at"),
+        }
+
+    def reset(self):
+        self.redis.delete(self.key)
+
+
+class CircuitBreakerClient:
+    """
+    Proxy of an adapter client (e.g. `Api(...).sms()`) whose method calls go
+    through `breaker`. When the circuit is open or a call could not connect,
+    the same method of `fallback` (e.g. the SOAP client) is called if one is
+    given. Other failures are raised: the panel may have accepted the message
+    already and the fallback would send it twice.
+    `on_call(breaker name, method name, seconds, failed)` is called after
+    every panel call, e.g. to record its latency.
+    """
+
+    unguarded = ("get_data",)
+
+    def __init__(self, client, breaker, fallback=None, on_call=None):
+        self.client = client
+        self.breaker = breaker
+        self.fallback = fallback
+        self.on_call = on_call
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if name.startswith("_") or name in self.unguarded or not callable(attr):
+            return attr
+
+        @wraps(attr)
+        def guarded(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+
+        return guarded
+
+    def call(self, name, *args, **kwargs):
+        ticket = self.breaker.allow()
+        if not ticket:
+            return self.call_fallback(
+                CircuitOpenError(self.breaker.name), name, *args, **kwargs
+            )
+        started = time.monotonic()
+        try:
+            result = getattr(self.client, name)(*args, **kwargs)
+        except self.breaker.errors as e:
+            self.breaker.record(True, ticket)
+            self.called(name, time.monotonic() - started, failed=True)
+            return self.call_fallback(e, name, *args, **kwargs)
+        elapsed = time.monotonic() - started
+        self.breaker.record(elapsed > self.breaker.slow_call_time, ticket)
+        self.called(name, elapsed, failed=False)
+        return result
+
+    def called(self, name, elapsed, failed):
+        if self.on_call is not None:
+            self.on_call(self.breaker.name, name, elapsed, failed)
+
+    def call_fallback(self, error, name, *args, **kwargs):
+        if self.fallback is None or not sent_nothing(error):
+            raise error
+        return getattr(self.fallback, name)(*args, **kwargs)
@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import sys
+import threading
+from urllib.parse import urlparse
+import requests
+import zeep
+from zeep.cache import InMemoryCache, SqliteCache
+from zeep.transports import Transport
+
+# Offline copies of the panel WSDLs, `<service>.wsdl` (e.g. send.wsdl for
+# send.asmx). They are used instead of the URL when present, refresh them with
+# `python -m adapter.melipayamak.clients download`. The image keeps them in
+# MELIPAYAMAK_WSDL_DIR, outside of the /app bind mount of docker-compose.
+WSDL_DIR = os.environ.get("MELIPAYAMAK_WSDL_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "wsdl"
+)
+WSDL_URLS = [
+    "http://api.payamak-panel.com/post/%s.asmx?wsdl" % service
+    for service in (
+        "send",
+        "receive",
+        "Voice",
+        "Schedule",
+        "Actions",
+        "contacts",
+        "Tickets",
+        "users",
+    )
+]
+# remote WSDL/XSD documents are cached for a day
+CACHE_TIMEOUT = 60 * 60 * 24
+LOAD_TIMEOUT = 30
+OPERATION_TIMEOUT = 30
+
+_clients = {}
+_cache = None
+_transport = None
+_lock = threading.Lock()
+
+
+def local_wsdl(url):
+    name = os.path.basename(urlparse(url).path).lower()
+    return os.path.join(WSDL_DIR, os.path.splitext(name)[0] + ".wsdl")
+
+
+def get_wsdl(url):
+    path = local_wsdl(url)
+    return path if os.path.exists(path) else url
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        try:
+            _cache = SqliteCache(timeout=CACHE_TIMEOUT)
+        except (OSError, sqlite3.Error):
+            _cache = InMemoryCache(timeout=CACHE_TIMEOUT)
+    return _cache
+
+
+def get_transport():
+    global _transport
+    if _transport is None:
+        _transport = Transport(
+            cache=get_cache(),
+            timeout=LOAD_TIMEOUT,
+            operation_timeout=OPERATION_TIMEOUT,
+        )
+    return _transport
+
+
+def get_client(url):
+    """
+    The zeep client of a WSDL url, built (and the WSDL parsed) once per process.
+    """
+    client = _clients.get(url)
+    if client is None:
+        with _lock:
+            client = _clients.get(url)
+            if client is None:
+                client = zeep.Client(get_wsdl(url), transport=get_transport())
+                _clients[url] = client
+    return client
+
+
+def _reset_transport():
+    # A forked worker keeps the parsed WSDLs but not the parent's sockets.
+    global _transport
+    if _transport is not None:
+        _transport = None
+        for client in _clients.values():
+            client.transport = get_transport()
+
+
+os.register_at_fork(after_in_child=_reset_transport)
+
+
+def download(*urls):
+    urls = urls or WSDL_URLS
+    os.makedirs(WSDL_DIR, exist_ok=True)
+    for url in urls:
+        response = requests.get(url, timeout=LOAD_TIMEOUT)
+        response.raise_for_status()
+        with open(local_wsdl(url), "wb") as f:
+            f.write(response.content)
+        print(local_wsdl(url))
+
+
+if __name__ == "__main__" and sys.argv[1:2] == ["download"]:
+    download(*sys.argv[2:])
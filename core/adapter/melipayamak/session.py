@@ -0,0 +1,129 @@
+import asyncio
+import aiohttp
+import zeep
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+from zeep.transports import Transport
+from zeep.wsdl.utils import etree_to_string
+from .clients import get_client
+
+CONNECTION_LIMIT = 20
+# concurrent calls of a batch, keep it at or below the connection limit
+CONCURRENCY = 10
+TIMEOUT = aiohttp.ClientTimeout(total=30, connect=5)
+
+
+def new_session(limit=CONNECTION_LIMIT, timeout=TIMEOUT):
+    connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+async def gather_limited(calls, concurrency=CONCURRENCY):
+    """
+    Await the `calls` coroutines, at most `concurrency` at a time. The results
+    keep the order of `calls`, a failed call is returned as its exception.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(call):
+        async with semaphore:
+            return await call
+
+    return await asyncio.gather(
+        *(limited(call) for call in calls), return_exceptions=True
+    )
+
+
+class AsyncSessionMixin:
+    """
+    One long lived aiohttp session (and connection pool) per client.
+    Pass a `session` to share a pool between clients, otherwise the client
+    opens its own on first use and closes it on `close()` / `async with`.
+    """
+
+    def __init__(self, session=None):
+        self._session = session
+        self._owns_session = session is None
+
+    @property
+    def session(self):
+        if self._owns_session and (self._session is None or self._session.closed):
+            self._session = new_session()
+        return self._session
+
+    async def close(self):
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def batch(self, calls, concurrency=CONCURRENCY):
+        """
+        Run many calls of this client at once over its pool, e.g.
+        `await client.batch(client.get_credit() for _ in range(10))`.
+        """
+        return await gather_limited(calls, concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class AiohttpTransport(Transport):
+    """
+    zeep transport that posts the SOAP envelopes over an aiohttp session.
+    It does not load WSDLs, AsyncSoapMixin gets them from clients.get_client
+    in a worker thread.
+    """
+
+    def __init__(self, aio_session, **kwargs):
+        super().__init__(**kwargs)
+        self.aio_session = aio_session
+
+    async def post_xml(self, address, envelope, headers):
+        message = etree_to_string(envelope)
+        async with self.aio_session.post(
+            address, data=message, headers=headers
+        ) as response:
+            content = await response.read()
+        # zeep parses the reply from a requests.Response
+        new = Response()
+        new._content = content
+        new.status_code = response.status
+        new.headers = CaseInsensitiveDict(response.headers)
+        new.encoding = response.charset
+        return new
+
+
+class AsyncSoapMixin(AsyncSessionMixin):
+    """
+    Awaitable SOAP operations. Every WSDL gets one AsyncClient per client
+    instance, it reuses the process wide parsed WSDL of clients.get_client and
+    posts over the shared session.
+    """
+
+    def __init__(self, session=None):
+        super().__init__(session)
+        self._async_clients = {}
+
+    async def get_async_client(self, url):
+        client = self._async_clients.get(url)
+        if client is None:
+            # The first use of a WSDL in the process fetches and parses it with
+            # blocking I/O, keep that off the event loop.
+            loop = asyncio.get_running_loop()
+            wsdl = (await loop.run_in_executor(None, get_client, url)).wsdl
+            transport = AiohttpTransport(self.session)
+            client = self._async_clients.setdefault(
+                url, zeep.AsyncClient(wsdl, transport=transport)
+            )
+        return client
+
+    async def call(self, url, func, data):
+        client = await self.get_async_client(url)
+        return await getattr(client.service, func)(**data)
+
+    async def close(self):
+        await super().close()
+        self._async_clients = {}
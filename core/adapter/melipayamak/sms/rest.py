@@ -1,15 +1,59 @@
+import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) timeouts in seconds
+TIMEOUT = (3.05, 10)
+POOL_SIZE = 10
+# Only failed connects are retried: every panel call is a POST and most of them
+# send an SMS, once the request went out (a read error or a 502/503/504 from
+# the gateway in front of the panel) the message may already be queued. Do not
+# allow POST retries or add a status_forcelist, that would send SMS twice.
+RETRY = Retry(
+    total=3,
+    connect=3,
+    read=0,
+    status=0,
+    other=0,
+    backoff_factor=0.3,
+)
+
+_session = None
+_session_pid = None
+
+
+def get_session():
+    # One keep-alive pool per process; a forked worker builds its own instead
+    # of sharing the parent's sockets.
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=RETRY
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _session, _session_pid = session, os.getpid()
+    return _session
 
 
 class Rest:
     PATH = "https://rest.payamak-panel.com/api/SendSMS/%s"
 
-    def __init__(self, username, password):
+    def __init__(self, username, password, session=None, timeout=TIMEOUT):
         self.username = username
         self.password = password
+        self._session = session
+        self.timeout = timeout
+
+    @property
+    def session(self):
+        return self._session or get_session()
 
     def post(self, url, data):
-        r = requests.post(url, data)
+        r = self.session.post(url, data, timeout=self.timeout)
+        r.raise_for_status()
         return r.json()
 
     def get_data(self):
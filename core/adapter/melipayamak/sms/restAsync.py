@@ -1,18 +1,19 @@
-import aiohttp
+from ..session import CONCURRENCY, AsyncSessionMixin
 
 
-class RestAsync:
+class RestAsync(AsyncSessionMixin):
     PATH = "https://rest.payamak-panel.com/api/SendSMS/%s"
 
-    def __init__(self, username, password):
+    def __init__(self, username, password, session=None):
         self.username = username
         self.password = password
+        super().__init__(session)
 
     async def post(self, url, data):
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, data=data) as resp:
-                if resp.status == 200:
-                    return await resp.text()
+        async with self.session.post(url, data=data) as resp:
+            if resp.status == 200:
+                # parsed like Rest.post, the panel does not always send a json type
+                return await resp.json(content_type=None)
 
     def get_data(self):
         return {"username": self.username, "password": self.password}
@@ -48,3 +49,11 @@ class RestAsync:
     async def get_numbers(self):
         url = self.PATH % ("GetUserNumbers")
         return await self.post(url, self.get_data())
+
+    async def send_many(self, messages, method="send", concurrency=CONCURRENCY):
+        """
+        Run `method` once per item of `messages` (its keyword arguments) over
+        the shared pool, see `batch`.
+        """
+        send = getattr(self, method)
+        return await self.batch((send(**kwargs) for kwargs in messages), concurrency)
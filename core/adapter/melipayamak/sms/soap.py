@@ -1,4 +1,4 @@
-from zeep import Client
+from ..clients import get_client
 
 
 class Soap:
@@ -16,12 +16,12 @@ class Soap:
         return {"username": self.username, "password": self.password}
 
     def get_credit(self):
-        client = Client(self.sendUrl)
+        client = get_client(self.sendUrl)
         result = client.service.GetCredit(**self.get_data())
         return result
 
     def is_delivered(self, recId):
-        client = Client(self.sendUrl)
+        client = get_client(self.sendUrl)
         result = None
 
         if isinstance(recId, list):
@@ -33,7 +33,7 @@ class Soap:
         return result
 
     def send(self, to, _from, text, isflash=False):
-        client = Client(self.sendUrl)
+        client = get_client(self.sendUrl)
         data = {"from": _from, "text": text, "isflash": isflash, "to": to}
         result = None
         if isinstance(to, list):
@@ -43,14 +43,14 @@ class Soap:
         return result
 
     def send2(self, to, _from, text, isflash=False, udh=""):
-        client = Client(self.sendUrl)
+        client = get_client(self.sendUrl)
         to = to if isinstance(to, list) else [to]
         data = {"from": _from, "text": text, "isflash": isflash, "to": to, "udh": udh}
         result = client.service.SendSms(**self.get_data(), **data)
         return result
 
     def send_with_domain(self, to, _from, text, isflash, domainName):
-        client = Client(self.sendUrl)
+        client = get_client(self.sendUrl)
         data = {
             "from": _from,
             "text": text,
@@ -62,7 +62,7 @@ class Soap:
         return result
 
     def send_by_base_number(self, text, to, bodyId):
-        client = Client(self.sendUrl)
+        client = get_client(self.sendUrl)
         data = {"text": text, "to": to, "bodyId": bodyId}
         result = None
         if isinstance(text, list):
@@ -72,19 +72,19 @@ class Soap:
         return result
 
     def get_messages(self, location, index, count, _from=""):
-        client = Client(self.sendUrl)
+        client = get_client(self.sendUrl)
         data = {"location": location, "index": index, "count": count, "from": _from}
         result = client.service.getMessages(**self.get_data(), **data)
         return result
 
     def get_messages_str(self, location, index, count, _from=""):
-        client = Client(self.receiveUrl)
+        client = get_client(self.receiveUrl)
         data = {"location": location, "index": index, "count": count, "from": _from}
         result = client.service.GetMessageStr(**self.get_data(), **data)
         return result
 
     def get_messages_by_date(self, location, index, count, dateFrom, dateTo, _from=""):
-        client = Client(self.receiveUrl)
+        client = get_client(self.receiveUrl)
         data = {
             "location": location,
             "index": index,
@@ -97,7 +97,7 @@ class Soap:
         return result
 
     def get_messages_receptions(self, msgId, fromRows):
-        client = Client(self.receiveUrl)
+        client = get_client(self.receiveUrl)
         data = {"msgId": msgId, "fromRows": fromRows}
         result = client.service.GetMessagesReceptions(**self.get_data(), **data)
         return result
@@ -105,7 +105,7 @@ class Soap:
     def get_users_messages_by_date(
         self, location, index, count, _from, dateFrom, dateTo
     ):
-        client = Client(self.receiveUrl)
+        client = get_client(self.receiveUrl)
         data = {
             "location": location,
             "index": index,
@@ -118,7 +118,7 @@ class Soap:
         return result
 
     def remove(self, msgIds):
-        client = Client(self.receiveUrl)
+        client = get_client(self.receiveUrl)
         data = {
             "msgIds": msgIds,
         }
@@ -126,7 +126,7 @@ class Soap:
         return result
 
     def get_price(self, irancellCount, mtnCount, _from, text):
-        client = Client(self.sendUrl)
+        client = get_client(self.sendUrl)
         data = {
             "irancellCount": irancellCount,
             "mtnCount": mtnCount,
@@ -137,7 +137,7 @@ class Soap:
         return result
 
     def get_inbox_count(self, isRead=False):
-        client = Client(self.sendUrl)
+        client = get_client(self.sendUrl)
         data = {
             "isRead": isRead,
         }
@@ -145,13 +145,13 @@ class Soap:
         return result
 
     def send_with_speech(self, to, _from, text, speech):
-        client = Client(self.voiceUrl)
+        client = get_client(self.voiceUrl)
         data = {"to": to, "from": _from, "smsBody": text, "speechBody": speech}
         result = client.service.SendSMSWithSpeechText(**self.get_data(), **data)
         return result
 
     def send_with_speech_schdule_date(self, to, _from, text, speech, scheduleDate):
-        client = Client(self.voiceUrl)
+        client = get_client(self.voiceUrl)
         data = {
             "to": to,
             "from": _from,
@@ -165,7 +165,7 @@ class Soap:
         return result
 
     def get_send_with_speech(self, recId):
-        client = Client(self.voiceUrl)
+        client = get_client(self.voiceUrl)
         data = {"recId": recId}
         result = client.service.GetSendSMSWithSpeechTextStatus(
             **self.get_data(), **data
@@ -173,7 +173,7 @@ class Soap:
         return result
 
     def get_multi_delivery(self, recId):
-        client = Client(self.sendUrl)
+        client = get_client(self.sendUrl)
         data = {"recId": recId}
         result = client.service.GetMultiDelivery2(**self.get_data(), **data)
         return result
@@ -181,7 +181,7 @@ class Soap:
     def send_multiple_schedule(
         self, to, _from, text, isflash, scheduleDateTime, period
     ):
-        client = Client(self.scheduleUrl)
+        client = get_client(self.scheduleUrl)
         data = {
             "to": to,
             "from": _from,
@@ -194,7 +194,7 @@ class Soap:
         return result
 
     def send_schedule(self, to, _from, text, isflash, scheduleDateTime, period):
-        client = Client(self.scheduleUrl)
+        client = get_client(self.scheduleUrl)
         data = {
             "to": to,
             "from": _from,
@@ -207,13 +207,13 @@ class Soap:
         return result
 
     def get_schedule_status(self, scheduleId):
-        client = Client(self.scheduleUrl)
+        client = get_client(self.scheduleUrl)
         data = {"scheduleId": scheduleId}
         result = client.service.GetScheduleStatus(**self.get_data(), **data)
         return result
 
     def remove_schedule(self, scheduleId):
-        client = Client(self.scheduleUrl)
+        client = get_client(self.scheduleUrl)
         data = {"scheduleId": scheduleId}
         result = client.service.RemoveSchedule(**self.get_data(), **data)
         return result
@@ -228,7 +228,7 @@ class Soap:
         repeatAfterDays,
         scheduleEndDateTime,
     ):
-        client = Client(self.scheduleUrl)
+        client = get_client(self.scheduleUrl)
         data = {
             "to": to,
             "from": _from,
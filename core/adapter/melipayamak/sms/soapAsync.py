@@ -1,16 +1,13 @@
-import zeep
-from zeep.transports import AsyncTransport
-import asyncio
+from ..session import AsyncSoapMixin
 
-# import time
 
-
-class SoapAsync:
+class SoapAsync(AsyncSoapMixin):
     PATH = "http://api.payamak-panel.com/post/%s.asmx?wsdl"
 
-    def __init__(self, username, password):
+    def __init__(self, username, password, session=None):
         self.username = username
         self.password = password
+        super().__init__(session)
         self.sendUrl = self.PATH % ("send")
         self.receiveUrl = self.PATH % ("receive")
         self.voiceUrl = self.PATH % ("Voice")
@@ -19,59 +16,42 @@ class SoapAsync:
     def get_data(self):
         return {"username": self.username, "password": self.password}
 
-    def makeRequest(self, url, func, data):
-        result = []
-
-        def handle_future(future):
-            result.extend(future.result())
-
-        loop = asyncio.get_event_loop()
-
-        transport = AsyncTransport(loop, cache=None)
-        client = zeep.Client(url, transport=transport)
-
-        tasks = [getattr(client.service, func)(**data)]
-        future = asyncio.gather(*tasks, return_exceptions=True)
+    async def makeRequest(self, url, func, data):
+        return await self.call(url, func, data)
 
-        future.add_done_callback(handle_future)
+    async def get_credit(self):
+        return await self.makeRequest(self.sendUrl, "GetCredit", self.get_data())
 
-        # st = time.time()
-        loop.run_until_complete(future)
-        loop.run_until_complete(transport.session.close())
-        # print("time: %.2f" % (time.time() - st))
-        return result
-
-    def get_credit(self):
-        return self.makeRequest(self.sendUrl, "GetCredit", self.get_data())
-
-    def is_delivered(self, recId):
+    async def is_delivered(self, recId):
         if isinstance(recId, list):
             data = {"recIds": recId}
-            return self.makeRequest(
+            return await self.makeRequest(
                 self.sendUrl, "GetDeliveries", {**data, **self.get_data()}
             )
         else:
             data = {"recId": recId}
-            return self.makeRequest(self.sendUrl, "GetDelivery", self.get_data())
+            return await self.makeRequest(self.sendUrl, "GetDelivery", self.get_data())
 
-    def send(self, to, _from, text, isflash=False):
+    async def send(self, to, _from, text, isflash=False):
         data = {"from": _from, "text": text, "isflash": isflash, "to": to}
 
         if isinstance(to, list):
-            return self.makeRequest(
+            return await self.makeRequest(
                 self.sendUrl, "SendSimpleSMS", {**data, **self.get_data()}
             )
         else:
-            return self.makeRequest(
+            return await self.makeRequest(
                 self.sendUrl, "SendSimpleSMS2", {**data, **self.get_data()}
             )
 
-    def send2(self, to, _from, text, isflash=False, udh=""):
+    async def send2(self, to, _from, text, isflash=False, udh=""):
         to = to if isinstance(to, list) else [to]
         data = {"from": _from, "text": text, "isflash": isflash, "to": to, "udh": udh}
-        return self.makeRequest(self.sendUrl, "SendSms", {**data, **self.get_data()})
+        return await self.makeRequest(
+            self.sendUrl, "SendSms", {**data, **self.get_data()}
+        )
 
-    def send_with_domain(self, to, _from, text, isflash, domainName):
+    async def send_with_domain(self, to, _from, text, isflash, domainName):
         data = {
             "from": _from,
             "text": text,
@@ -79,35 +59,37 @@ class SoapAsync:
             "to": to,
             "domainName": domainName,
         }
-        return self.makeRequest(
+        return await self.makeRequest(
             self.sendUrl, "SendWithDomain", {**data, **self.get_data()}
         )
 
-    def send_by_base_number(self, text, to, bodyId):
+    async def send_by_base_number(self, text, to, bodyId):
         data = {"text": text, "to": to, "bodyId": bodyId}
 
         if isinstance(text, list):
-            return self.makeRequest(
+            return await self.makeRequest(
                 self.sendUrl, "SendByBaseNumber", {**data, **self.get_data()}
             )
         else:
-            return self.makeRequest(
+            return await self.makeRequest(
                 self.sendUrl, "SendByBaseNumber2", {**data, **self.get_data()}
             )
 
-    def get_messages(self, location, index, count, _from=""):
+    async def get_messages(self, location, index, count, _from=""):
         data = {"location": location, "index": index, "count": count, "from": _from}
-        return self.makeRequest(
+        return await self.makeRequest(
             self.sendUrl, "getMessages", {**data, **self.get_data()}
         )
 
-    def get_messages_str(self, location, index, count, _from=""):
+    async def get_messages_str(self, location, index, count, _from=""):
         data = {"location": location, "index": index, "count": count, "from": _from}
-        return self.makeRequest(
+        return await self.makeRequest(
             self.receiveUrl, "GetMessageStr", {**data, **self.get_data()}
         )
 
-    def get_messages_by_date(self, location, index, count, dateFrom, dateTo, _from=""):
+    async def get_messages_by_date(
+        self, location, index, count, dateFrom, dateTo, _from=""
+    ):
         data = {
             "location": location,
             "index": index,
@@ -116,17 +98,17 @@ class SoapAsync:
             "dateFrom": dateFrom,
             "dateTo": dateTo,
         }
-        return self.makeRequest(
+        return await self.makeRequest(
             self.receiveUrl, "GetMessagesByDate", {**data, **self.get_data()}
         )
 
-    def get_messages_receptions(self, msgId, fromRows):
+    async def get_messages_receptions(self, msgId, fromRows):
         data = {"msgId": msgId, "fromRows": fromRows}
-        return self.makeRequest(
+        return await self.makeRequest(
             self.receiveUrl, "GetMessagesReceptions", {**data, **self.get_data()}
         )
 
-    def get_users_messages_by_date(
+    async def get_users_messages_by_date(
         self, location, index, count, _from, dateFrom, dateTo
     ):
         data = {
@@ -137,44 +119,46 @@ class SoapAsync:
             "dateFrom": dateFrom,
             "dateTo": dateTo,
         }
-        return self.makeRequest(
+        return await self.makeRequest(
             self.receiveUrl, "GetUsersMessagesByDate", {**data, **self.get_data()}
         )
 
-    def remove(self, msgIds):
+    async def remove(self, msgIds):
         data = {
             "msgIds": msgIds,
         }
-        return self.makeRequest(
+        return await self.makeRequest(
             self.receiveUrl, "RemoveMessages2", {**data, **self.get_data()}
         )
 
-    def get_price(self, irancellCount, mtnCount, _from, text):
+    async def get_price(self, irancellCount, mtnCount, _from, text):
         data = {
             "irancellCount": irancellCount,
             "mtnCount": mtnCount,
             "text": text,
             "from": _from,
         }
-        return self.makeRequest(
+        return await self.makeRequest(
             self.sendUrl, "GetSmsPrice", {**data, **self.get_data()}
         )
 
-    def get_inbox_count(self, isRead=False):
+    async def get_inbox_count(self, isRead=False):
         data = {
             "isRead": isRead,
         }
-        return self.makeRequest(
+        return await self.makeRequest(
             self.sendUrl, "GetInboxCount", {**data, **self.get_data()}
         )
 
-    def send_with_speech(self, to, _from, text, speech):
+    async def send_with_speech(self, to, _from, text, speech):
         data = {"to": to, "from": _from, "smsBody": text, "speechBody": speech}
-        return self.makeRequest(
+        return await self.makeRequest(
             self.voiceUrl, "SendSMSWithSpeechText", {**data, **self.get_data()}
         )
 
-    def send_with_speech_schdule_date(self, to, _from, text, speech, scheduleDate):
+    async def send_with_speech_schdule_date(
+        self, to, _from, text, speech, scheduleDate
+    ):
         data = {
             "to": to,
             "from": _from,
@@ -182,25 +166,25 @@ class SoapAsync:
             "speechBody": speech,
             "scheduleDate": scheduleDate,
         }
-        return self.makeRequest(
+        return await self.makeRequest(
             self.voiceUrl,
             "SendSMSWithSpeechTextBySchduleDate",
             {**data, **self.get_data()},
         )
 
-    def get_send_with_speech(self, recId):
+    async def get_send_with_speech(self, recId):
         data = {"recId": recId}
-        return self.makeRequest(
+        return await self.makeRequest(
             self.voiceUrl, "GetSendSMSWithSpeechTextStatus", {**data, **self.get_data()}
         )
 
-    def get_multi_delivery(self, recId):
+    async def get_multi_delivery(self, recId):
         data = {"recId": recId}
-        return self.makeRequest(
+        return await self.makeRequest(
             self.sendUrl, "GetMultiDelivery2", {**data, **self.get_data()}
         )
 
-    def send_multiple_schedule(
+    async def send_multiple_schedule(
         self, to, _from, text, isflash, scheduleDateTime, period
     ):
         data = {
@@ -211,11 +195,11 @@ class SoapAsync:
             "scheduleDateTime": scheduleDateTime,
             "period": period,
         }
-        return self.makeRequest(
+        return await self.makeRequest(
             self.scheduleUrl, "AddMultipleSchedule", {**data, **self.get_data()}
         )
 
-    def send_schedule(self, to, _from, text, isflash, scheduleDateTime, period):
+    async def send_schedule(self, to, _from, text, isflash, scheduleDateTime, period):
         data = {
             "to": to,
             "from": _from,
@@ -224,23 +208,23 @@ class SoapAsync:
             "scheduleDateTime": scheduleDateTime,
             "period": period,
         }
-        return self.makeRequest(
+        return await self.makeRequest(
             self.scheduleUrl, "AddSchedule", {**data, **self.get_data()}
         )
 
-    def get_schedule_status(self, scheduleId):
+    async def get_schedule_status(self, scheduleId):
         data = {"scheduleId": scheduleId}
-        return self.makeRequest(
+        return await self.makeRequest(
             self.scheduleUrl, "GetScheduleStatus", {**data, **self.get_data()}
         )
 
-    def remove_schedule(self, scheduleId):
+    async def remove_schedule(self, scheduleId):
         data = {"scheduleId": scheduleId}
-        return self.makeRequest(
+        return await self.makeRequest(
             self.scheduleUrl, "RemoveSchedule", {**data, **self.get_data()}
         )
 
-    def add_usance(
+    async def add_usance(
         self,
         to,
         _from,
@@ -259,6 +243,6 @@ class SoapAsync:
             "repeatAfterDays": repeatAfterDays,
             "scheduleEndDateTime": scheduleEndDateTime,
         }
-        return self.makeRequest(
+        return await self.makeRequest(
             self.scheduleUrl, "AddUsance", {**data, **self.get_data()}
         )
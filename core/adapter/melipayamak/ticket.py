@@ -1,4 +1,4 @@
-from zeep import Client
+from .clients import get_client
 
 
 class Ticket:
@@ -7,7 +7,10 @@ class Ticket:
     def __init__(self, username, password):
         self.username = username
         self.password = password
-        self.client = Client(self.PATH)
+
+    @property
+    def client(self):
+        return get_client(self.PATH)
 
     def get_data(self):
         return {"username": self.username, "password": self.password}
@@ -0,0 +1,94 @@
+"""
+Per request authentication cost of the old DEFAULT_AUTHENTICATION_CLASSES
+chain (JWT, Token, Basic, Session) versus the JWT only API policy, for a valid
+JWT, an anonymous request and a wrong `Authorization: Basic` password. Runs
+against a throwaway test database of the configured engine.
+
+    cd core && python -m benchmarks.auth_chain [requests]
+"""
+import base64
+import os
+import sys
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+import django  # noqa: E402
+
+django.setup()
+
+from unittest import mock  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from rest_framework import authentication  # noqa: E402
+from rest_framework.permissions import AllowAny  # noqa: E402
+from rest_framework.response import Response  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+from rest_framework.views import APIView  # noqa: E402
+from rest_framework_simplejwt.authentication import JWTAuthentication  # noqa: E402
+from accounts.api.serializers import TokenObtainPairSerializer  # noqa: E402
+from accounts.authentication import API_AUTHENTICATION  # noqa: E402
+from accounts.models import User  # noqa: E402
+
+CHAINS = [
+    (
+        "old chain",
+        [
+            JWTAuthentication,
+            authentication.TokenAuthentication,
+            authentication.BasicAuthentication,
+            authentication.SessionAuthentication,
+        ],
+    ),
+    ("jwt only", API_AUTHENTICATION),
+]
+
+
+def make_view(classes):
+    class View(APIView):
+        authentication_classes = classes
+        permission_classes = [AllowAny]
+        throttle_classes = []
+
+        def get(self, request):
+            return Response({"user": str(request.user)})
+
+    return View.as_view()
+
+
+def run(view, headers, requests):
+    factory = APIRequestFactory()
+    view(factory.get("/", **headers))  # warm up, fills the auth state cache
+    started = time.perf_counter()
+    for _ in range(requests):
+        view(factory.get("/", **headers))
+    return (time.perf_counter() - started) / requests * 1000
+
+
+def main(requests=20):
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        with mock.patch("accounts.models.enqueue"):
+            user = User.objects.create_user(phone="09123456789", password="benchmark")
+        access = TokenObtainPairSerializer.get_token(user).access_token
+        wrong = base64.b64encode(b"09123456789:wrong").decode()
+        requests_ = [
+            ("valid jwt", {"HTTP_AUTHORIZATION": f"Bearer {access}"}),
+            ("anonymous", {}),
+            ("bad basic", {"HTTP_AUTHORIZATION": f"Basic {wrong}"}),
+        ]
+        for name, classes in CHAINS:
+            view = make_view(classes)
+            results = [
+                f"{label} {run(view, headers, requests):8.3f} ms"
+                for label, headers in requests_
+            ]
+            print(f"{name:>10}: " + ", ".join(results))
+        cache.delete_many([f"auth:user:{user.pk}", f"auth:revoked:{user.pk}"])
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,80 @@
+"""
+OTP latency under a bulk notification backlog, on the in-memory broker:
+three workers on one queue versus the CELERY_TASK_ROUTES of the project with
+a worker per queue. The tasks only sleep for the time an SMS request takes,
+their names are the real ones so the real routes apply.
+
+    cd core && python -m benchmarks.celery_queues [bulk chunks] [otps]
+"""
+import os
+import statistics
+import sys
+import time
+from contextlib import ExitStack
+from celery import Celery
+from celery.contrib.testing.worker import start_worker
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+from django.conf import settings  # noqa: E402
+
+SMS_TIME = 0.02
+
+
+def make_app(routes):
+    app = Celery("celery_queues", broker="memory://", backend="cache+memory://")
+    app.conf.update(
+        task_default_queue=settings.CELERY_TASK_DEFAULT_QUEUE,
+        task_routes=routes,
+        worker_prefetch_multiplier=settings.CELERY_WORKER_PREFETCH_MULTIPLIER,
+        # the memory transport polls, by default once a second
+        broker_transport_options={"polling_interval": 0.001},
+    )
+
+    @app.task(name="accounts.tasks.send_otp")
+    def send_otp(enqueued_at):
+        started = time.time()
+        time.sleep(SMS_TIME)
+        return started - enqueued_at
+
+    @app.task(name="gathering.tasks.send_notification_chunk")
+    def send_notification_chunk():
+        time.sleep(SMS_TIME)
+
+    return app, send_otp, send_notification_chunk
+
+
+def run(name, routes, queues, chunks, otps):
+    app, send_otp, send_notification_chunk = make_app(routes)
+    with ExitStack() as stack:
+        # solo workers, the memory transport is slow with a thread pool
+        for queue in queues:
+            stack.enter_context(
+                start_worker(
+                    app,
+                    queues=[queue],
+                    pool="solo",
+                    perform_ping_check=False,
+                    shutdown_timeout=60,
+                )
+            )
+        for _ in range(chunks):
+            send_notification_chunk.delay()
+        results = []
+        for _ in range(otps):
+            results.append(send_otp.delay(time.time()))
+            time.sleep(0.05)
+        waits = [result.get(timeout=600, interval=0.01) * 1000 for result in results]
+    print(
+        f"{name:>12}: OTP queue wait median {statistics.median(waits):8.1f} ms, "
+        f"max {max(waits):8.1f} ms"
+    )
+
+
+def main(chunks=200, otps=20):
+    queue = settings.CELERY_TASK_DEFAULT_QUEUE
+    run("one queue", {}, [queue] * 3, chunks, otps)
+    run("routed", settings.CELERY_TASK_ROUTES, ["otp", queue, "bulk"], chunks, otps)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
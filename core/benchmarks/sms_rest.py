@@ -0,0 +1,42 @@
+"""
+Per message latency of the melipayamak REST client against a local stub:
+a new connection per message (the old module level `requests.post`) versus
+the pooled keep-alive session of `Rest`. The stub is plain HTTP on loopback,
+so the TLS handshake saved against the real panel is not part of the numbers.
+
+    cd core && python -m benchmarks.sms_rest [messages]
+"""
+import sys
+import time
+import requests
+from adapter.melipayamak.sms import rest
+from .stub_server import StubServer
+
+
+class UnpooledRest(rest.Rest):
+    def post(self, url, data):
+        return requests.post(url, data, timeout=self.timeout).json()
+
+
+def run(client, messages):
+    started = time.perf_counter()
+    for i in range(messages):
+        client.send_by_base_number([str(i)], "09120000000", 115131)
+    return (time.perf_counter() - started) / messages * 1000
+
+
+def main(messages=500):
+    with StubServer() as stub:
+        path = stub.url + "/api/SendSMS/%s"
+        clients = [
+            ("requests.post", UnpooledRest("test", "test")),
+            ("pooled session", rest.Rest("test", "test")),
+        ]
+        for name, client in clients:
+            client.PATH = path
+            run(client, 10)  # warm up
+            print(f"{name:>15}: {run(client, messages):.3f} ms/message")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,141 @@
+"""
+Throughput of the melipayamak SOAP clients against a local stub with a fixed
+per request delay:
+
+* a new zeep client per call (the old `Soap`, WSDL fetched and parsed each time)
+* `Soap` on the cached client, sequential
+* `SoapAsync`, awaited one by one
+* `SoapAsync.batch`, many operations in flight over one pool
+
+    cd core && python -m benchmarks.sms_soap [calls] [delay ms] [concurrency]
+"""
+import asyncio
+import sys
+import time
+import zeep
+from adapter.melipayamak.sms import Soap, SoapAsync
+from .stub_server import StubHandler, StubServer
+
+# A one operation WSDL served by the stub, shaped like the panel's send.asmx.
+WSDL = """<?xml version="1.0" encoding="utf-8"?>
+<wsdl:definitions xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/"
+    xmlns:tns="http://tempuri.org/" xmlns:s="http://www.w3.org/2001/XMLSchema"
+    xmlns:wsdl="http://schemas.xmlsoap.org/wsdl/"
+    targetNamespace="http://tempuri.org/">
+  <wsdl:types>
+    <s:schema elementFormDefault="qualified" targetNamespace="http://tempuri.org/">
+      <s:element name="GetCredit"><s:complexType><s:sequence>
+        <s:element minOccurs="0" maxOccurs="1" name="username" type="s:string"/>
+        <s:element minOccurs="0" maxOccurs="1" name="password" type="s:string"/>
+      </s:sequence></s:complexType></s:element>
+      <s:element name="GetCreditResponse"><s:complexType><s:sequence>
+        <s:element minOccurs="1" maxOccurs="1" name="GetCreditResult" type="s:double"/>
+      </s:sequence></s:complexType></s:element>
+    </s:schema>
+  </wsdl:types>
+  <wsdl:message name="GetCreditSoapIn">
+    <wsdl:part name="parameters" element="tns:GetCredit"/>
+  </wsdl:message>
+  <wsdl:message name="GetCreditSoapOut">
+    <wsdl:part name="parameters" element="tns:GetCreditResponse"/>
+  </wsdl:message>
+  <wsdl:portType name="SendSoap">
+    <wsdl:operation name="GetCredit">
+      <wsdl:input message="tns:GetCreditSoapIn"/>
+      <wsdl:output message="tns:GetCreditSoapOut"/>
+    </wsdl:operation>
+  </wsdl:portType>
+  <wsdl:binding name="SendSoap" type="tns:SendSoap">
+    <soap:binding transport="http://schemas.xmlsoap.org/soap/http"/>
+    <wsdl:operation name="GetCredit">
+      <soap:operation soapAction="http://tempuri.org/GetCredit" style="document"/>
+      <wsdl:input><soap:body use="literal"/></wsdl:input>
+      <wsdl:output><soap:body use="literal"/></wsdl:output>
+    </wsdl:operation>
+  </wsdl:binding>
+  <wsdl:service name="Send">
+    <wsdl:port name="SendSoap" binding="tns:SendSoap">
+      <soap:address location="%s/post/send.asmx"/>
+    </wsdl:port>
+  </wsdl:service>
+</wsdl:definitions>
+"""
+RESPONSE = b"""<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
+  <soap:Body>
+    <GetCreditResponse xmlns="http://tempuri.org/">
+      <GetCreditResult>12.5</GetCreditResult>
+    </GetCreditResponse>
+  </soap:Body>
+</soap:Envelope>"""
+
+
+class SoapStubHandler(StubHandler):
+    body = RESPONSE
+    content_type = "text/xml; charset=utf-8"
+
+    def do_GET(self):
+        wsdl = (WSDL % self.server.url).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", self.content_type)
+        self.send_header("Content-Length", str(len(wsdl)))
+        self.end_headers()
+        self.wfile.write(wsdl)
+
+
+class UncachedSoap(Soap):
+    def get_credit(self):
+        client = zeep.Client(self.sendUrl)
+        return client.service.GetCredit(**self.get_data())
+
+
+def report(name, calls, started):
+    elapsed = time.perf_counter() - started
+    print(f"{name:>22}: {calls / elapsed:8.1f} calls/s")
+
+
+def run_sync(name, client, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        client.get_credit()
+    report(name, calls, started)
+
+
+async def run_async(client, calls, concurrency):
+    async with client:
+        await client.get_credit()  # warm up, builds the async client
+        started = time.perf_counter()
+        for _ in range(calls):
+            await client.get_credit()
+        report("SoapAsync sequential", calls, started)
+
+        started = time.perf_counter()
+        results = await client.batch(
+            (client.get_credit() for _ in range(calls)), concurrency
+        )
+        assert not any(isinstance(result, Exception) for result in results)
+        report(f"SoapAsync batch ({concurrency})", calls, started)
+
+
+def main(calls=200, delay=20, concurrency=10):
+    SoapStubHandler.delay = delay / 1000
+    with StubServer(SoapStubHandler) as stub:
+        stub.server.url = stub.url
+        wsdl_url = stub.url + "/post/send.asmx?wsdl"
+
+        uncached = UncachedSoap("test", "test")
+        uncached.sendUrl = wsdl_url
+        run_sync("new client per call", uncached, max(calls // 10, 1))
+
+        soap = Soap("test", "test")
+        soap.sendUrl = wsdl_url
+        soap.get_credit()  # warm up, parses the WSDL
+        run_sync("Soap cached client", soap, calls)
+
+        soap_async = SoapAsync("test", "test")
+        soap_async.sendUrl = wsdl_url
+        asyncio.run(run_async(soap_async, calls, concurrency))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,51 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Answers every POST like the melipayamak REST panel does for a sent
+    message. HTTP/1.1, so clients that keep the connection alive can reuse it.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # headers and body are separate writes, do not wait for delayed ACKs
+    disable_nagle_algorithm = True
+    body = json.dumps(
+        {"Value": "1234567890123456", "RetStatus": 1, "StrRetStatus": "Ok"}
+    ).encode()
+    content_type = "application/json"
+    # simulated processing time of the panel, in seconds
+    delay = 0
+    status = 200
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.delay)
+        self.send_response(self.status)
+        self.send_header("Content-Type", self.content_type)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """Runs `handler` on a random local port in a background thread."""
+
+    def __init__(self, handler=StubHandler):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.url = "http://127.0.0.1:%s" % self.server.server_port
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
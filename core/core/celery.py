@@ -17,3 +17,6 @@ app.config_from_object(settings, namespace="CELERY")
 
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
+
+# Queue wait, runtime and SMS panel latency of every task, see /metrics/
+import utils.metrics  # noqa: E402,F401
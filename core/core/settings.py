@@ -62,6 +62,7 @@ INSTALLED_APPS = [
     "corsheaders",
     "accounts.apps.AccountsConfig",
     "gathering.apps.GatheringConfig",
+    "outbox.apps.OutboxConfig",
     "django_filters",
     "silk",
     "azbankgateways",
@@ -141,6 +142,20 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Argon2id, costs of the OWASP minimum by default (19 MiB, 2 passes, 1 lane).
+# Raising them rehashes every password on its next login.
+PASSWORD_HASHERS = [
+    "accounts.hashers.Argon2PasswordHasher",
+    "accounts.hashers.PBKDF2PasswordHasher",
+]
+ARGON2_TIME_COST = config("ARGON2_TIME_COST", cast=int, default=2)
+ARGON2_MEMORY_COST = config("ARGON2_MEMORY_COST", cast=int, default=19 * 1024)
+ARGON2_PARALLELISM = config("ARGON2_PARALLELISM", cast=int, default=1)
+# password hashes computed at once per process, a request waits this many
+# seconds for a free slot before an API view answers 429, others keep waiting
+PASSWORD_HASH_CONCURRENCY = config("PASSWORD_HASH_CONCURRENCY", cast=int, default=2)
+PASSWORD_HASH_WAIT = config("PASSWORD_HASH_WAIT", cast=float, default=1)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.1/topics/i18n/
@@ -178,25 +193,45 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
+    # JWT only, see the policy in accounts.authentication
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-        "rest_framework.authentication.TokenAuthentication",
-        "rest_framework.authentication.BasicAuthentication",
-        "rest_framework.authentication.SessionAuthentication",
+        "accounts.authentication.StatelessJWTAuthentication",
     ],
     "DEFAULT_THROTTLE_CLASSES": [
         "rest_framework.throttling.AnonRateThrottle",
         "rest_framework.throttling.UserRateThrottle",
     ],
-    "DEFAULT_THROTTLE_RATES": {"anon": "20/minute", "user": "40/minute"},
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "20/minute",
+        "user": "40/minute",
+        "otp_status": "60/minute",
+    },
 }
 if not DEBUG:
     REST_FRAMEWORK.update(
         {"DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",)}
     )
+else:
+    # the browsable API logs in with a session (api-auth/)
+    REST_FRAMEWORK["DEFAULT_AUTHENTICATION_CLASSES"].append(
+        "rest_framework.authentication.SessionAuthentication"
+    )
 
 # time for clear cache (OTP SYSTEM )
 OTP_CODE_TIME = 180
+# codes a phone / a client ip can request in OTP_LIMIT_WINDOW seconds
+OTP_PHONE_LIMIT = config("OTP_PHONE_LIMIT", cast=int, default=5)
+OTP_IP_LIMIT = config("OTP_IP_LIMIT", cast=int, default=20)
+OTP_LIMIT_WINDOW = config("OTP_LIMIT_WINDOW", cast=int, default=60 * 60)
+
+# time a seat of a paid gathering is held while the user is at the bank gateway
+SEAT_HOLD_TIME = config("SEAT_HOLD_TIME", cast=int, default=600)
+
+# upper bound for cached gathering responses, they are invalidated by version bumps
+GATHERING_CACHE_TIME = config("GATHERING_CACHE_TIME", cast=int, default=60 * 60)
+
+# square avatar variants (pixels) stored as WebP and JPEG by process_avatar
+AVATAR_SIZES = {"small": 64, "medium": 160, "large": 400}
 
 
 # json web token configs
@@ -206,7 +241,13 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": False,
     "BLACKLIST_AFTER_ROTATION": False,
     "UPDATE_LAST_LOGIN": True,
+    # tokens carry the claims of accounts.authentication.ClaimsUser
+    "TOKEN_OBTAIN_SERIALIZER": "accounts.api.serializers.TokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "accounts.api.serializers.TokenRefreshSerializer",
 }
+# active/staff/ban flags of token users are re-read from the database at most
+# this often, saving a user drops them at once
+AUTH_STATE_CACHE_TIME = config("AUTH_STATE_CACHE_TIME", cast=int, default=60)
 
 # Caching configuration1
 CACHES = {
@@ -220,6 +261,39 @@ CACHES = {
 # celery configuration
 
 CELERY_BROKER_URL = "redis://redis:6379/1"
+# Only tasks polled by clients (send_otp) keep their result, for an hour.
+CELERY_RESULT_BACKEND = "redis://redis:6379/2"
+CELERY_RESULT_EXPIRES = 60 * 60
+CELERY_TASK_IGNORE_RESULT = True
+# OTP codes expire in minutes, so they get a queue (and workers) of their own
+# instead of waiting behind welcome messages or a bulk notification backlog.
+CELERY_TASK_DEFAULT_QUEUE = "notifications"
+CELERY_TASK_ROUTES = {
+    "accounts.tasks.send_otp": {"queue": "otp", "priority": 0},
+    "accounts.tasks.*": {"queue": "notifications"},
+    "gathering.tasks.*": {"queue": "bulk", "priority": 9},
+}
+# redis emulates priorities with one list per step, 0 is consumed first
+CELERY_TASK_DEFAULT_PRIORITY = 5
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "priority_steps": [0, 3, 6, 9],
+    "queue_order_strategy": "priority",
+}
+# a worker reserves one message per process, long bulk chunks do not hold
+# back tasks another process could run; raise it per worker with
+# --prefetch-multiplier
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_BEAT_SCHEDULE = {
+    "poll-sms-deliveries": {
+        "task": "accounts.tasks.poll_sms_deliveries",
+        "schedule": config("SMS_DELIVERY_POLL_INTERVAL", cast=int, default=5 * 60),
+    },
+    # publishes the outbox messages an after commit flush left behind
+    "relay-outbox": {
+        "task": "outbox.tasks.relay_outbox",
+        "schedule": config("OUTBOX_RELAY_INTERVAL", cast=int, default=30),
+    },
+}
 
 
 AZ_IRANIAN_BANK_GATEWAYS = {
@@ -20,7 +20,8 @@ from django.conf.urls.static import static
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from decouple import config
-from core.views import admin_meme
+from core.views import admin_meme, metrics_view
+from accounts.authentication import BROWSER_AUTHENTICATION
 from azbankgateways.urls import az_bank_gateways_urls
 
 schema_view = get_schema_view(
@@ -34,6 +35,7 @@ schema_view = get_schema_view(
     ),
     public=True,
     permission_classes=(permissions.IsAdminUser,),
+    authentication_classes=BROWSER_AUTHENTICATION,
 )
 
 urlpatterns = [
@@ -62,6 +64,8 @@ urlpatterns = [
         f"{config('SILK_URL', default='silk')}/", include("silk.urls", namespace="silk")
     ),
     path("bankgateways/", az_bank_gateways_urls()),
+    # task metrics, prometheus text format
+    path("metrics/", metrics_view, name="metrics"),
 ]
 
 
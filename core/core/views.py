@@ -1,5 +1,45 @@
+from decouple import config
 from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from utils import metrics
+
+# bearer token of the prometheus scraper, staff users can always read /metrics/
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
 
 
 def admin_meme(requests):
     return HttpResponse("<center> <h1> hihi, try to think smarter! </h1> </center>")
+
+
+def circuit_metrics():
+    from accounts.tasks import SMS_METHODS, get_circuit_breaker
+
+    states, opened = {}, {}
+    for method in SMS_METHODS:
+        breaker = get_circuit_breaker(method)
+        stats = breaker.stats()
+        labels = {"circuit": breaker.name}
+        for state in (breaker.CLOSED, breaker.OPEN, breaker.HALF_OPEN):
+            key = metrics.sample("sms_circuit_state", labels, state=state)
+            states[key] = int(stats["state"] == state)
+        opened[metrics.sample("sms_circuit_opened_total", labels)] = stats[
+            "times_opened"
+        ]
+    return [
+        ("sms_circuit_state", "gauge", "State of the SMS panel circuits", states),
+        ("sms_circuit_opened_total", "counter", "Times a circuit opened", opened),
+    ]
+
+
+def metrics_view(request):
+    auth = request.headers.get("Authorization", "")
+    token = auth[len("Bearer ") :] if auth.startswith("Bearer ") else ""
+    if not (
+        request.user.is_staff
+        or (METRICS_TOKEN and constant_time_compare(token, METRICS_TOKEN))
+    ):
+        return HttpResponse(status=403)
+    return HttpResponse(
+        metrics.render(circuit_metrics()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
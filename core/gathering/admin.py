@@ -16,6 +16,8 @@ class GatheringAdmin(admin.ModelAdmin):
         "price",
         "date",
         "max_seats",
+        "registered_seats",
+        "paid_seats",
         "is_held",
         "is_online",
         "is_occupied",
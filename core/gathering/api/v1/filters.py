@@ -0,0 +1,54 @@
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+# Arabic yeh/kaf/alef maksura to their Persian forms, ZWNJ to a space.
+# Keep in sync with gathering_normalize_fa() in gathering.postgres.
+PERSIAN_TRANSLATION = str.maketrans({"ي": "ی", "ك": "ک", "ى": "ی", "\u200c": " "})
+
+
+def normalize_persian(text):
+    return text.translate(PERSIAN_TRANSLATION)
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Ranked full text search over the trigger maintained `search_vector` of the
+    model (title, description and presenter names for gatherings).
+    Every term is matched as a prefix, results are ordered by rank unless an
+    explicit ordering is requested. Other databases fall back to the
+    `search_fields` lookups of SearchFilter.
+    Place it after OrderingFilter in `filter_backends`.
+    """
+
+    search_vector_field = "search_vector"
+
+    def get_search_query(self, terms):
+        words = []
+        for term in terms:
+            words += re.findall(r"\w+", normalize_persian(term))
+        if not words:
+            return None
+        raw_query = " & ".join(f"{word}:*" for word in words)
+        return SearchQuery(raw_query, config="simple", search_type="raw")
+
+    def filter_queryset(self, request, queryset, view):
+        if connections[queryset.db].vendor != "postgresql":
+            return super().filter_queryset(request, queryset, view)
+
+        query = self.get_search_query(self.get_search_terms(request))
+        if query is None:
+            return queryset
+        # ts_rank is a real, compare it as a double so keyset cursors round trip.
+        queryset = queryset.filter(**{self.search_vector_field: query}).annotate(
+            search_rank=Cast(
+                SearchRank(F(self.search_vector_field), query), FloatField()
+            )
+        )
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+        return queryset.order_by("-search_rank", *queryset.query.order_by)
@@ -0,0 +1,111 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+from gathering.services import response_cache
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for read only viewsets.
+    The validators come from one aggregate query (count, max pk and max
+    `last_modified_field`), so a 304 is answered before anything is serialized.
+    Set `last_modified_field = None` for models without a modification date,
+    and list the modification dates of serialized relations (e.g.
+    "gathering__updated_date") in `related_modified_fields`.
+    Lists only get the ETag: a deleted row changes the count, but it does not
+    move the newest modification date back.
+    """
+
+    last_modified_field = "updated_date"
+    related_modified_fields = ()
+
+    def get_conditional_validators(self, request, queryset):
+        aggregates = {"count": Count("pk"), "last_pk": Max("pk")}
+        fields = [self.last_modified_field] if self.last_modified_field else []
+        fields += self.related_modified_fields
+        for i, field in enumerate(fields):
+            aggregates[f"modified_{i}"] = Max(field)
+        values = queryset.order_by().aggregate(**aggregates)
+
+        modified = [values[f"modified_{i}"] for i in range(len(fields))]
+        last_modified = max(filter(None, modified), default=None)
+        # The ETag keeps the full precision, Last-Modified only has seconds.
+        etag = hashlib.md5(
+            f"{request.get_full_path()}:{values['count']}:{values['last_pk']}:"
+            f"{last_modified.timestamp() if last_modified else None}".encode()
+        ).hexdigest()
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        return values["count"], quote_etag(etag), last_modified
+
+    def conditional_response(self, request, queryset, get_response, detail=False):
+        count, etag, last_modified = self.get_conditional_validators(request, queryset)
+        if detail and not count:
+            # No validators for a missing object, the view answers 404.
+            return get_response()
+        if not detail:
+            last_modified = None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = get_response()
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request,
+            self.filter_queryset(self.get_queryset()),
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: kwargs[lookup_url_kwarg]}
+        )
+        return self.conditional_response(
+            request,
+            queryset,
+            lambda: super(ConditionalGetMixin, self).retrieve(
+                request, *args, **kwargs
+            ),
+            detail=True,
+        )
+
+
+class VersionedCacheMixin:
+    """
+    Cache serialized list/detail payloads per gathering version, see
+    services.response_cache for the keys and the invalidation.
+    """
+
+    def cached_data(self, key, get_response):
+        data = cache.get(key)
+        if data is None:
+            data = get_response().data
+            cache.set(key, data, settings.GATHERING_CACHE_TIME)
+        return data
+
+    def list(self, request, *args, **kwargs):
+        data = self.cached_data(
+            response_cache.response_key(request),
+            lambda: super(VersionedCacheMixin, self).list(request, *args, **kwargs),
+        )
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        data = self.cached_data(
+            response_cache.response_key(request, pk=kwargs[lookup_url_kwarg]),
+            lambda: super(VersionedCacheMixin, self).retrieve(
+                request, *args, **kwargs
+            ),
+        )
+        return Response(data)
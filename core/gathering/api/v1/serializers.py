@@ -1,9 +1,11 @@
 from rest_framework import serializers
 from gathering.models import Gathering, GatheringUser, Photo, Discount
 from accounts.models import User
+from accounts.api.serializers import AvatarVariantsField
 from utils.constants import Errors
 from django.urls import reverse
 from gathering.services.bank_gateway import Gateway
+from gathering.services.seat_reservation import SeatReservation
 from rest_framework import status
 from django.utils import timezone
 import datetime
@@ -45,12 +47,7 @@ class GatheringSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         request = self.context.get("request")
         rep = super().to_representation(instance)
-        if instance.price == 0:
-            filled_seats = GatheringUser.objects.filter(gathering=instance.id).count()
-        else:
-            filled_seats = GatheringUser.objects.filter(
-                gathering=instance.id, is_paid=True
-            ).count()
+        filled_seats = instance.filled_seats
         if request.parser_context.get("kwargs").get("pk"):
             rep.pop("snippet", None)
             rep.pop("absolute_url", None)
@@ -80,9 +77,20 @@ class GatheringEditSerializer(serializers.ModelSerializer):
 
 # Serializer for user data (read-only)
 class UserDataSerializer(serializers.ModelSerializer):
+    # lists of attendees only need the small avatar
+    avatar = AvatarVariantsField(source="avatar_variants", size="small")
+
     class Meta:
         model = User
-        fields = ["id", "phone", "first_name", "last_name", "fullname", "is_ban"]
+        fields = [
+            "id",
+            "phone",
+            "first_name",
+            "last_name",
+            "fullname",
+            "is_ban",
+            "avatar",
+        ]
         read_only_fields = [
             "id",
             "phone",
@@ -90,6 +98,7 @@ class UserDataSerializer(serializers.ModelSerializer):
             "last_name",
             "fullname",
             "is_ban",
+            "avatar",
         ]
 
 # Serializer for creating gathering registrations
@@ -116,21 +125,20 @@ class GatheringRegistrationCreateSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         request = self.context.get("request")
 
+        # Lock the gathering row until the registration is saved, so concurrent
+        # requests cannot oversell it (the view validates and saves in one transaction).
+        attrs["gathering"] = Gathering.objects.select_for_update().get(
+            pk=attrs.get("gathering").pk
+        )
+
         # Check if the user is already registered for the gathering
         if GatheringUser.objects.filter(
-            gathering=attrs.get("gathering"), user=request.user
+            gathering=attrs.get("gathering"), user_id=request.user.pk
         ).exists():
             raise serializers.ValidationError(Errors.ALREADY_REGISTERED)
 
         # Calculate the number of filled seats
-        if attrs.get("gathering").price == 0:
-            filled_seats = GatheringUser.objects.filter(
-                gathering=attrs.get("gathering").id
-            ).count()
-        else:
-            filled_seats = GatheringUser.objects.filter(
-                gathering=attrs.get("gathering").id, is_paid=True
-            ).count()
+        filled_seats = attrs.get("gathering").filled_seats
 
         # Validate the discount code
         if attrs.get("discount_code", None):
@@ -164,7 +172,8 @@ class GatheringRegistrationCreateSerializer(serializers.ModelSerializer):
         return super().validate(attrs)
 
     def create(self, validated_data):
-        validated_data["user"] = self.context.get("request").user
+        # the request user may be a stateless token user, not a model instance
+        validated_data["user_id"] = self.context.get("request").user.pk
         return super().create(validated_data)
 
 # Serializer for canceling gathering registrations
@@ -208,14 +217,7 @@ class GatheringRegistrationSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "is_paid"]
 
     def to_representation(self, instance):
-        if instance.gathering.price == 0:
-            filled_seats = GatheringUser.objects.filter(
-                gathering=instance.gathering.id
-            ).count()
-        else:
-            filled_seats = GatheringUser.objects.filter(
-                gathering=instance.gathering.id, is_paid=True
-            ).count()
+        filled_seats = instance.gathering.filled_seats
         rep = super().to_representation(instance)
         if instance.gathering.price == 0 or instance.is_paid:
             rep["gathering"] = {
@@ -302,9 +304,7 @@ class GatheringGoGatewaySerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         request = self.context.get("request")
         if self.instance.gathering.price != 0:
-            filled_seats = GatheringUser.objects.filter(
-                gathering=self.instance.gathering.id
-            ).count()
+            filled_seats = self.instance.gathering.paid_seats
         else:
             raise serializers.ValidationError(Errors.EVENT_IS_FREE)
 
@@ -328,6 +328,10 @@ class GatheringGoGatewaySerializer(serializers.ModelSerializer):
         elif self.instance.user.is_ban:
             raise serializers.ValidationError(Errors.USER_BANNED)
 
+        # Hold a seat while the user is at the bank gateway.
+        if not SeatReservation(self.instance.gathering).hold(self.instance.pk):
+            raise serializers.ValidationError(Errors.Full_capacity)
+
         if self.instance.discount != None:
             attrs["final_price"] = self.instance.gathering.price - (
                 (
@@ -343,10 +347,11 @@ class GatheringGoGatewaySerializer(serializers.ModelSerializer):
         return super().validate(attrs)
 
     def bank_initialization(self):
+        reservation = SeatReservation(self.instance.gathering)
         if self.final_price <= 0:
             obj = GatheringUser.objects.get(pk=self.context["pk"])
-            obj.is_paid = True
-            obj.save()
+            if not reservation.confirm(obj):
+                return Errors.Full_capacity, status.HTTP_400_BAD_REQUEST
             return {
                 "detail": "The user was successfully registered in the event"
             }, status.HTTP_201_CREATED
@@ -356,7 +361,8 @@ class GatheringGoGatewaySerializer(serializers.ModelSerializer):
             )
             if data["success"] == True:
                 return data["context"], status.HTTP_200_OK
-            elif data["success"] == False and data["object_DoesNotExist"] == False:
+            reservation.release(self.instance.pk)
+            if data["success"] == False and data["object_DoesNotExist"] == False:
                 return {"detail": "Error"}, status.HTTP_502_BAD_GATEWAY
             elif data["success"] == False and data["object_DoesNotExist"]:
                 return {"detail": "Not found."}, status.HTTP_404_NOT_FOUND
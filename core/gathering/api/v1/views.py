@@ -15,7 +15,7 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework import filters
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 import datetime
@@ -24,6 +24,9 @@ from utils.constants import Errors
 from rest_framework import generics
 from rest_framework.views import APIView
 from gathering.services.bank_gateway import Gateway
+from gathering.api.v1.mixins import ConditionalGetMixin, VersionedCacheMixin
+from gathering.api.v1.filters import FullTextSearchFilter
+from utils.pagination import KeysetPagination
 
 # ViewSet for managing gathering CRUD operations (staff only)
 class GatheringEditModelViewSet(viewsets.ModelViewSet):
@@ -34,24 +37,31 @@ class GatheringEditModelViewSet(viewsets.ModelViewSet):
     queryset = Gathering.objects.all()
 
 # ViewSet for retrieving gathering details and filtering/searching
-class GatheringModelViewSet(viewsets.ReadOnlyModelViewSet):
+class GatheringModelViewSet(
+    ConditionalGetMixin, VersionedCacheMixin, viewsets.ReadOnlyModelViewSet
+):
     """All users can view event details, filter by date, and search for events."""
 
     permission_classes = [AllowAny]
     serializer_class = GatheringSerializer
-    queryset = Gathering.objects.all()
+    queryset = Gathering.objects.prefetch_related("presenter")
+    pagination_class = KeysetPagination
     lookup_field = "pk"
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ["title"]
+    filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
+    # icontains fallback of FullTextSearchFilter outside Postgres
+    search_fields = ["title", "description"]
     ordering_fields = ["date", "is_held", "is_occupied"]
+    ordering = ["-date"]
 
 # ViewSet for validating discount codes
-class DiscountModelViewSet(viewsets.ReadOnlyModelViewSet):
+class DiscountModelViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """Validation for discount codes"""
 
     permission_classes = [AllowAny]
     serializer_class = DiscountSerializer
-    queryset = Discount.objects.filter(status=True)
+    queryset = Discount.objects.filter(status=True).select_related("gathering")
+    # the gathering title and price are part of the body
+    related_modified_fields = ("gathering__updated_date",)
     lookup_field = "code"
     lookup_url_kwarg = "get_discount"
 
@@ -62,17 +72,25 @@ class GatheringRegistrationModelViewSet(viewsets.ModelViewSet):
     """
 
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    ordering = ["-created_date"]
 
     def get_queryset(self, pk=None):
         """
         The get_queryset function allows us to filter the data received from the database based on our needs.
         """
         if self.action == "list":
-            queryset = GatheringUser.objects.filter(user=pk)
+            queryset = GatheringUser.objects.filter(user_id=pk).select_related(
+                "gathering", "user"
+            )
         elif self.action == "destroy":
-            queryset = get_object_or_404(GatheringUser, id=pk)
+            queryset = get_object_or_404(
+                GatheringUser.objects.select_related("gathering"), id=pk
+            )
         elif self.action == "retrieve":
-            queryset = GatheringUser.objects.filter(user=self.request.user)
+            queryset = GatheringUser.objects.filter(
+                user_id=self.request.user.pk
+            ).select_related("gathering", "user")
         return queryset
 
     def get_serializer_class(self, *args, **kwargs):
@@ -85,10 +103,9 @@ class GatheringRegistrationModelViewSet(viewsets.ModelViewSet):
 
     def list(self, request):
         """Get the list of events registered by the user."""
-        serializer = self.serializer_class(
-            self.get_queryset(pk=request.user), many=True
-        )
-        return Response(serializer.data)
+        page = self.paginate_queryset(self.get_queryset(pk=request.user.pk))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def create(self, request):
         """
@@ -98,8 +115,9 @@ class GatheringRegistrationModelViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(
             data=request.data, many=False, context={"request": self.request}
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def destroy(self, request, pk):
@@ -139,12 +157,14 @@ class GatheringCheckInModelViewSet(viewsets.ReadOnlyModelViewSet):
             return Response(Errors.INVALID_UUID, status=status.HTTP_406_NOT_ACCEPTABLE)
 
 # ViewSet for gathering photos (staff only)
-class GatheringImageModelViewSet(viewsets.ReadOnlyModelViewSet):
+class GatheringImageModelViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """Gathering Photos (staff only)"""
 
     permission_classes = [AllowAny]
     serializer_class = GatheringImageSerializer
     queryset = Photo.objects.all()
+    pagination_class = KeysetPagination
+    ordering = ["-id"]
     lookup_field = "pk"
     filter_backends = [filters.SearchFilter]
     search_fields = ["gathering__id"]
@@ -156,7 +176,10 @@ class GatheringGoGatewayApiView(generics.CreateAPIView):  # UpdateAPIView
     allowed_methods = ["POST", "OPTIONS"]
 
     def get_queryset(self, id=None):
-        obj = get_object_or_404(GatheringUser, pk=id)
+        obj = get_object_or_404(
+            GatheringUser.objects.select_related("gathering", "user", "discount"),
+            pk=id,
+        )
         return obj
 
     def post(self, request, pk, *args, **kwargs):
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class GatheringConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "gathering"
+
+    def ready(self):
+        from gathering.postgres import create_postgres_objects
+
+        post_migrate.connect(create_postgres_objects, sender=self)
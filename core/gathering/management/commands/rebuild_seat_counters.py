@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from gathering.services.seat_counters import rebuild_seat_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the registered/paid seat counters of gatherings from GatheringUser rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "gathering_ids",
+            nargs="*",
+            type=int,
+            help="Only rebuild these gatherings (default: all of them)",
+        )
+
+    def handle(self, *args, **options):
+        updated = rebuild_seat_counters(options["gathering_ids"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt seat counters of {updated} gathering(s)")
+        )
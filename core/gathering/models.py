@@ -1,10 +1,16 @@
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.dispatch import receiver
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete, m2m_changed
 import os
 import uuid
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
+from gathering.services.response_cache import bump_version
+from gathering.services.seat_reservation import SeatReservation
 
 # Create your models here.
 
@@ -23,15 +29,46 @@ class Gathering(models.Model):
     is_online = models.BooleanField(default=False)
     is_held = models.BooleanField(default=False)
     is_occupied = models.BooleanField(default=False)
+    # Denormalized seat counters, kept in sync by the GatheringUser signals.
+    registered_seats = models.PositiveIntegerField(default=0, editable=False)
+    paid_seats = models.PositiveIntegerField(default=0, editable=False)
+    # Full text document, maintained by a Postgres trigger (see gathering.postgres).
+    search_vector = SearchVectorField(null=True, editable=False)
     created_date = models.DateTimeField(auto_now_add=True)
     updated_date = models.DateTimeField(auto_now=True)
 
+    # Fields written by queries and triggers only, never by save().
+    DB_MANAGED_FIELDS = ("registered_seats", "paid_seats", "search_vector")
+
+    class Meta:
+        indexes = [
+            # keyset pagination of the event list
+            models.Index(fields=["date", "id"], name="gathering_date_id_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
+    # Free gatherings count every registration, paid ones only the paid registrations.
+    @property
+    def filled_seats(self):
+        if self.price == 0:
+            return self.registered_seats
+        return self.paid_seats
+
     def get_snippet(self):
         return self.description[0:60] + "..."
 
+    # Never write the seat counters back from a possibly stale instance.
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DB_MANAGED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     # Custom validation to ensure link field consistency.
     def clean(self):
         if self.is_online and not self.link:
@@ -46,8 +83,9 @@ class Gathering(models.Model):
 # Define a model for discounts associated with gatherings.
 class Discount(models.Model):
     code = models.CharField(max_length=250, blank=False, null=False, unique=True)
+    # indexed by discount_gathering_status_idx
     gathering = models.ForeignKey(
-        Gathering, blank=False, null=False, on_delete=models.CASCADE
+        Gathering, blank=False, null=False, on_delete=models.CASCADE, db_index=False
     )
     discount_percentage = models.PositiveSmallIntegerField(
         default=0,
@@ -59,13 +97,24 @@ class Discount(models.Model):
     created_date = models.DateTimeField(auto_now_add=True)
     updated_date = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # active discounts of a gathering (validation and deactivation)
+            models.Index(
+                fields=["gathering", "status"], name="discount_gathering_status_idx"
+            ),
+        ]
+
     def __str__(self):
         return f"{self.code}"
 
 # Define a model to associate users with gatherings and discounts.
 class GatheringUser(models.Model):
-    user = models.ForeignKey(to="accounts.User", on_delete=models.CASCADE)
-    gathering = models.ForeignKey(Gathering, on_delete=models.CASCADE)
+    # Both are indexed as the leading column of a composite index below.
+    user = models.ForeignKey(
+        to="accounts.User", on_delete=models.CASCADE, db_index=False
+    )
+    gathering = models.ForeignKey(Gathering, on_delete=models.CASCADE, db_index=False)
     discount = models.ForeignKey(
         Discount, blank=True, null=True, on_delete=models.SET_NULL
     )
@@ -83,16 +132,41 @@ class GatheringUser(models.Model):
             "gathering",
             "user",
         ]
+        indexes = [
+            # keyset pagination of the registrations of a user
+            models.Index(
+                fields=["user", "created_date", "id"],
+                name="gatheringuser_user_created_idx",
+            ),
+            # paid (or unpaid) registrations per gathering
+            models.Index(fields=["gathering", "is_paid"], name="gatheringuser_paid_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user}"
 
+    # Flag the registration as paid and count it toward the paid seats only once.
+    def mark_as_paid(self):
+        with transaction.atomic():
+            updated = GatheringUser.objects.filter(pk=self.pk, is_paid=False).update(
+                is_paid=True
+            )
+            if updated:
+                Gathering.objects.filter(pk=self.gathering_id).update(
+                    paid_seats=F("paid_seats") + 1, updated_date=timezone.now()
+                )
+                bump_version(self.gathering_id)
+        self.is_paid = True
+        return bool(updated)
+
 # Define a model for photos associated with gatherings.
 class Photo(models.Model):
     gathering = models.ForeignKey(
         Gathering, related_name="gathering_img", on_delete=models.CASCADE
     )
     image = models.ImageField(upload_to="events/gathering")
+    # moves the ETag when an image is replaced, photos older than it have none
+    updated_date = models.DateTimeField(auto_now=True, null=True)
 
     def __str__(self):
         return f"{self.gathering.id}"
@@ -104,6 +178,70 @@ def auto_delete_file_on_delete(sender, instance, **kwargs):
         if os.path.isfile(instance.image.path):
             os.remove(instance.image.path)
 
+# Signal handlers to keep the gathering seat counters in sync with registrations.
+def change_seat_counters(gathering_id, registered, paid):
+    # seat confirmations are counted by reconcile_seats, maybe not yet
+    Gathering.objects.filter(pk=gathering_id).update(
+        registered_seats=F("registered_seats") + registered,
+        paid_seats=Greatest(F("paid_seats") + paid, 0),
+        updated_date=timezone.now(),
+    )
+
+
+@receiver(pre_save, sender=GatheringUser)
+def remember_stored_seat(sender, instance, update_fields=None, **kwargs):
+    # The stored row, not the instance, tells what the counters hold (e.g. admin edits).
+    instance._stored_seat = None
+    if instance._state.adding:
+        return
+    if update_fields is not None and not {"gathering", "is_paid"} & set(update_fields):
+        return
+    instance._stored_seat = (
+        GatheringUser.objects.filter(pk=instance.pk)
+        .values_list("gathering_id", "is_paid")
+        .first()
+    )
+
+
+@receiver(post_save, sender=GatheringUser)
+def increase_seat_counters(sender, instance, created, **kwargs):
+    if created:
+        change_seat_counters(instance.gathering_id, 1, int(instance.is_paid))
+        return
+    stored = getattr(instance, "_stored_seat", None)
+    if stored is None or stored == (instance.gathering_id, instance.is_paid):
+        return
+    gathering_id, is_paid = stored
+    if gathering_id == instance.gathering_id:
+        change_seat_counters(gathering_id, 0, int(instance.is_paid) - int(is_paid))
+    else:
+        change_seat_counters(gathering_id, -1, -int(is_paid))
+        change_seat_counters(instance.gathering_id, 1, int(instance.is_paid))
+        bump_version(gathering_id)
+
+
+@receiver(post_delete, sender=GatheringUser)
+def decrease_seat_counters(sender, instance, **kwargs):
+    change_seat_counters(instance.gathering_id, -1, -int(instance.is_paid))
+
+# Signal handlers to keep the Redis seat state of a gathering in line with edits.
+@receiver(post_save, sender=Gathering)
+def update_seat_capacity(sender, instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(
+            lambda: SeatReservation(instance).set_capacity(instance.max_seats)
+        )
+
+
+@receiver(post_delete, sender=GatheringUser)
+def free_paid_seat(sender, instance, **kwargs):
+    if instance.is_paid:
+        # the instance has no pk anymore once the callback runs
+        registration_id, gathering = instance.pk, Gathering(pk=instance.gathering_id)
+        transaction.on_commit(
+            lambda: SeatReservation(gathering).forget_paid(registration_id)
+        )
+
 # Signal handler to delete unpaid users when a Gathering is held and has a non-zero price.
 @receiver(post_save, sender=Gathering)
 def delete_unpaid_users(sender, instance, created, **kwargs):
@@ -115,6 +253,10 @@ def delete_unpaid_users(sender, instance, created, **kwargs):
                 ).delete()
             except GatheringUser.DoesNotExist:
                 pass
+            # Only paid registrations are left, so both counters must match.
+            Gathering.objects.filter(pk=instance.id).update(
+                registered_seats=F("paid_seats")
+            )
 
 # Signal handler to deactivate discounts when a Gathering is held.
 @receiver(post_save, sender=Gathering)
@@ -124,3 +266,58 @@ def deactivate_discounts_on_event_held(sender, instance, created, **kwargs):
             Discount.objects.filter(gathering=instance.id, status=True).update(
                 status=False
             )
+
+# Signal handlers to invalidate the cached gathering responses.
+@receiver(post_save, sender=Gathering)
+@receiver(post_delete, sender=Gathering)
+def bump_gathering_version(sender, instance, **kwargs):
+    bump_version(instance.pk)
+
+
+@receiver(post_save, sender=GatheringUser)
+@receiver(post_delete, sender=GatheringUser)
+@receiver(post_save, sender=Photo)
+@receiver(post_delete, sender=Photo)
+def bump_related_gathering_version(sender, instance, **kwargs):
+    bump_version(instance.gathering_id)
+
+
+@receiver(m2m_changed, sender=Gathering.presenter.through)
+def bump_presenter_gathering_version(sender, instance, action, pk_set, **kwargs):
+    if isinstance(instance, Gathering):
+        gathering_ids = [instance.pk]
+    elif action == "pre_clear":
+        # presenters cleared from the user side, pk_set is not sent for a clear
+        instance._presented_gathering_ids = list(
+            instance.gathering_set.values_list("pk", flat=True)
+        )
+        return
+    elif action == "post_clear":
+        gathering_ids = instance._presented_gathering_ids
+    else:
+        gathering_ids = list(pk_set)
+    if action.startswith("post_"):
+        touch_gatherings(gathering_ids)
+
+
+# Presenters are listed by their full name, a renamed presenter changes the body.
+@receiver(post_save, sender="accounts.User")
+def bump_presented_gathering_version(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    if created:
+        return
+    if update_fields is not None and not {"first_name", "last_name"} & set(
+        update_fields
+    ):
+        return
+    touch_gatherings(list(instance.gathering_set.values_list("pk", flat=True)))
+
+
+def touch_gatherings(gathering_ids):
+    # updated_date moves the ETag, the version drops the cached responses
+    if not gathering_ids:
+        return
+    Gathering.objects.filter(pk__in=gathering_ids).update(updated_date=timezone.now())
+    for pk in gathering_ids:
+        bump_version(pk)
@@ -0,0 +1,109 @@
+from django.db import connections, transaction
+
+# Postgres only objects that cannot be declared on the models. Migrations of
+# this project are generated at deploy time, so they are (re)created after
+# every migrate; each statement is idempotent. A failing statement fails the
+# migrate, search would silently find nothing without them.
+POSTGRES_STATEMENTS = [
+    # ---------------------------------------------------------  full text search
+    # Arabic yeh/kaf/alef maksura to their Persian forms, ZWNJ to a space.
+    # Keep in sync with gathering.api.v1.filters.normalize_persian.
+    """
+    CREATE OR REPLACE FUNCTION gathering_normalize_fa(value text) RETURNS text AS $$
+        SELECT translate(coalesce(value, ''), 'يكى' || chr(8204), 'یکی ')
+    $$ LANGUAGE sql IMMUTABLE
+    """,
+    """
+    CREATE OR REPLACE FUNCTION gathering_search_document(
+        row_id bigint, title text, description text
+    ) RETURNS tsvector AS $$
+        SELECT
+            setweight(to_tsvector('simple', gathering_normalize_fa(title)), 'A')
+            || setweight(to_tsvector('simple', gathering_normalize_fa(description)), 'B')
+            || setweight(to_tsvector('simple', gathering_normalize_fa((
+                SELECT string_agg(u.first_name || ' ' || u.last_name, ' ')
+                FROM gathering_gathering_presenter p
+                JOIN accounts_user u ON u.id = p.user_id
+                WHERE p.gathering_id = row_id
+            ))), 'C')
+    $$ LANGUAGE sql STABLE
+    """,
+    """
+    CREATE OR REPLACE FUNCTION gathering_search_vector_trigger() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := gathering_search_document(NEW.id, NEW.title, NEW.description);
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION gathering_refresh_search_vector(row_id bigint)
+    RETURNS void AS $$
+        UPDATE gathering_gathering
+        SET search_vector = gathering_search_document(id, title, description)
+        WHERE id = row_id
+    $$ LANGUAGE sql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION gathering_presenter_search_vector_trigger()
+    RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            PERFORM gathering_refresh_search_vector(OLD.gathering_id);
+        ELSE
+            PERFORM gathering_refresh_search_vector(NEW.gathering_id);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION gathering_user_search_vector_trigger()
+    RETURNS trigger AS $$
+    BEGIN
+        PERFORM gathering_refresh_search_vector(gathering_id)
+        FROM gathering_gathering_presenter WHERE user_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS gathering_search_vector_update ON gathering_gathering",
+    """
+    CREATE TRIGGER gathering_search_vector_update
+    BEFORE INSERT OR UPDATE OF title, description ON gathering_gathering
+    FOR EACH ROW EXECUTE PROCEDURE gathering_search_vector_trigger()
+    """,
+    "DROP TRIGGER IF EXISTS gathering_search_vector_presenter "
+    "ON gathering_gathering_presenter",
+    """
+    CREATE TRIGGER gathering_search_vector_presenter
+    AFTER INSERT OR DELETE ON gathering_gathering_presenter
+    FOR EACH ROW EXECUTE PROCEDURE gathering_presenter_search_vector_trigger()
+    """,
+    "DROP TRIGGER IF EXISTS gathering_search_vector_user ON accounts_user",
+    """
+    CREATE TRIGGER gathering_search_vector_user
+    AFTER UPDATE OF first_name, last_name ON accounts_user
+    FOR EACH ROW
+    WHEN (OLD.first_name IS DISTINCT FROM NEW.first_name
+          OR OLD.last_name IS DISTINCT FROM NEW.last_name)
+    EXECUTE PROCEDURE gathering_user_search_vector_trigger()
+    """,
+    "CREATE INDEX IF NOT EXISTS gathering_search_vector_idx "
+    "ON gathering_gathering USING gin (search_vector)",
+    # backfill rows created before the trigger existed
+    """
+    UPDATE gathering_gathering
+    SET search_vector = gathering_search_document(id, title, description)
+    WHERE search_vector IS NULL
+    """,
+]
+
+
+def create_postgres_objects(sender, using="default", **kwargs):
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        for statement in POSTGRES_STATEMENTS:
+            cursor.execute(statement)
@@ -8,6 +8,8 @@ from azbankgateways import (
 )
 from azbankgateways.exceptions import AZBankGatewaysException
 from gathering.models import GatheringUser
+from gathering.services.seat_reservation import SeatReservation
+from utils.constants import Errors
 from rest_framework.response import Response
 from rest_framework import status
 
@@ -88,19 +90,36 @@ class Gateway:
                 "object_DoesNotExist": False,
             }
 
+        try:
+            gathering_user_obj = GatheringUser.objects.select_related("gathering").get(
+                bank_gateway=bank_record
+            )
+        except GatheringUser.DoesNotExist:
+            gathering_user_obj = None
+        else:
+            reservation = SeatReservation(gathering_user_obj.gathering)
+
         if bank_record.is_success:
-            try:
-                gathering_user_obj = GatheringUser.objects.get(bank_gateway=bank_record)
-            except GatheringUser.DoesNotExist:
+            if gathering_user_obj is None:
                 return {
                     "success": False,
                     "context": None,
                     "error": "Not Found",
                     "object_DoesNotExist": True,
                 }
-            else:
-                gathering_user_obj.is_paid = True
-                gathering_user_obj.save()
+            elif not reservation.confirm(gathering_user_obj):
+                # The hold expired and the seat was sold meanwhile.
+                logging.critical(
+                    "Payment %s of registration %s has no seat left, refund it",
+                    tracking_code,
+                    gathering_user_obj.pk,
+                )
+                return {
+                    "success": False,
+                    "context": None,
+                    "error": Errors.SEAT_HOLD_EXPIRED["detail"],
+                    "object_DoesNotExist": False,
+                }
 
             return {
                 "success": True,
@@ -109,6 +128,10 @@ class Gateway:
                 "object_DoesNotExist": False,
             }
 
+        # Give the held seat back to other users.
+        if gathering_user_obj is not None:
+            reservation.release(gathering_user_obj.pk)
+
         # پرداخت موفق نبوده است. اگر پول کم شده است ظرف مدت ۴۸ ساعت پول به حساب شما بازخواهد گشت.
         return {
             "success": False,
@@ -0,0 +1,44 @@
+import hashlib
+from django.core.cache import cache
+from django.db import transaction
+
+LIST_VERSION_KEY = "gathering:version:list"
+
+
+def detail_version_key(pk):
+    return f"gathering:version:{pk}"
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+def _bump(pk):
+    for key in (LIST_VERSION_KEY, detail_version_key(pk)):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, None)
+
+
+def bump_version(pk):
+    """
+    Invalidate the cached list and detail responses of a gathering.
+    The bump waits for the commit, so a reader can never cache stale rows
+    under the new version.
+    """
+    transaction.on_commit(lambda: _bump(pk))
+
+
+def response_key(request, pk=None):
+    # The full URI covers the host (absolute urls) and the search/ordering params.
+    uri_hash = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    if pk is None:
+        return f"gathering:response:list:{get_version(LIST_VERSION_KEY)}:{uri_hash}"
+    version = get_version(detail_version_key(pk))
+    return f"gathering:response:{pk}:{version}:{uri_hash}"
+
@@ -0,0 +1,48 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from gathering.services.response_cache import bump_version
+
+
+def rebuild_seat_counters(gathering_ids=None):
+    """
+    Recount the registered/paid seat counters of the gatherings (all of them
+    by default) from their GatheringUser rows, returns how many changed.
+    """
+    from gathering.models import Gathering, GatheringUser
+
+    seats = (
+        GatheringUser.objects.filter(gathering=OuterRef("pk"))
+        .values("gathering")
+        .annotate(
+            registered=Count("id"),
+            paid=Count("id", filter=Q(is_paid=True)),
+        )
+    )
+    registered = Coalesce(
+        Subquery(seats.values("registered"), output_field=IntegerField()),
+        Value(0),
+    )
+    paid = Coalesce(
+        Subquery(seats.values("paid"), output_field=IntegerField()),
+        Value(0),
+    )
+    queryset = Gathering.objects.all()
+    if gathering_ids:
+        queryset = queryset.filter(pk__in=gathering_ids)
+    stale = list(
+        queryset.annotate(registered=registered, paid=paid)
+        .exclude(registered_seats=F("registered"), paid_seats=F("paid"))
+        .values_list("pk", flat=True)
+    )
+
+    # One UPDATE statement, so the counters are rebuilt atomically.
+    updated = Gathering.objects.filter(pk__in=stale).update(
+        registered_seats=registered,
+        paid_seats=paid,
+        updated_date=timezone.now(),
+    )
+    # the cached responses and ETags still show the old counters
+    for pk in stale:
+        bump_version(pk)
+    return updated
@@ -0,0 +1,233 @@
+import time
+from django.conf import settings
+from django.db import transaction
+from django_redis import get_redis_connection
+from outbox.relay import enqueue
+
+# The seats of a gathering live in Redis, so buyers never wait on its row:
+# capacity     max_seats, seeded from Postgres by the first hold or confirm
+# paid set     ids of the paid GatheringUsers
+# holds        sorted set, member = GatheringUser id, score = expiry timestamp
+# Expired holds are dropped before counting, so a seat comes back by itself
+# when the user never returns from the gateway. The scripts answer -1 while
+# the gathering is not seeded. Every script keeps the state STATE_TIME more.
+STATE_TIME = 24 * 60 * 60
+
+SEED_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('DEL', KEYS[2])
+for i = 3, #ARGV do
+    redis.call('SADD', KEYS[2], ARGV[i])
+end
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[1])
+return 1
+"""
+
+HOLD_SCRIPT = """
+local capacity = tonumber(redis.call('GET', KEYS[1]))
+if not capacity then
+    return -1
+end
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+if redis.call('SISMEMBER', KEYS[2], ARGV[3]) == 1 then
+    return 1
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', ARGV[1])
+if not redis.call('ZSCORE', KEYS[3], ARGV[3]) then
+    local taken = redis.call('ZCARD', KEYS[3]) + redis.call('SCARD', KEYS[2])
+    if taken >= capacity then
+        return 0
+    end
+end
+redis.call('ZADD', KEYS[3], ARGV[2], ARGV[3])
+redis.call('EXPIRE', KEYS[3], ARGV[4])
+return 1
+"""
+
+RELEASE_SCRIPT = """
+return redis.call('ZREM', KEYS[1], ARGV[1])
+"""
+
+# A live hold is turned into a paid seat. When it already expired, the payment
+# only gets a seat that is neither paid nor held by someone else. 2 when the
+# registration was paid already.
+CONFIRM_SCRIPT = """
+local capacity = tonumber(redis.call('GET', KEYS[1]))
+if not capacity then
+    return -1
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+if redis.call('SISMEMBER', KEYS[2], ARGV[2]) == 1 then
+    return 2
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', ARGV[1])
+if redis.call('ZREM', KEYS[3], ARGV[2]) == 0 then
+    local taken = redis.call('ZCARD', KEYS[3]) + redis.call('SCARD', KEYS[2])
+    if taken >= capacity then
+        return 0
+    end
+end
+redis.call('SADD', KEYS[2], ARGV[2])
+return 1
+"""
+
+COUNT_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+return redis.call('ZCARD', KEYS[1])
+"""
+
+# Only a seeded state is corrected, otherwise the next hold seeds it.
+RECONCILE_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'XX', 'KEEPTTL') then
+    for i = 2, #ARGV do
+        redis.call('SADD', KEYS[2], ARGV[i])
+    end
+end
+return 1
+"""
+
+
+class SeatReservation:
+    """
+    Redis backed seat holds for paid gatherings.
+
+    A registration holds a seat for settings.SEAT_HOLD_TIME seconds while the
+    user is at the bank gateway. The bank callback confirms the hold (the
+    registration is paid from then on) or releases it. Capacity, paid seats
+    and holds are decided together in one script, without locking the
+    gathering row; Gathering.paid_seats and the Redis state are reconciled
+    with the GatheringUser rows by the reconcile_seats task afterwards.
+    """
+
+    _scripts = {}
+
+    def __init__(self, gathering):
+        self.gathering = gathering
+        self.key = f"gathering:seat_holds:{gathering.pk}"
+        self.capacity_key = f"gathering:seat_capacity:{gathering.pk}"
+        self.paid_key = f"gathering:paid_seats:{gathering.pk}"
+        self.redis = get_redis_connection("default")
+
+    def _script(self, source):
+        if source not in self._scripts:
+            self._scripts[source] = self.redis.register_script(source)
+        return self._scripts[source]
+
+    def _paid_ids(self):
+        from gathering.models import GatheringUser
+
+        return list(
+            GatheringUser.objects.filter(
+                gathering_id=self.gathering.pk, is_paid=True
+            ).values_list("pk", flat=True)
+        )
+
+    def _max_seats(self):
+        from gathering.models import Gathering
+
+        return int(
+            Gathering.objects.values_list("max_seats", flat=True).get(
+                pk=self.gathering.pk
+            )
+        )
+
+    def _run(self, source, args):
+        # plain reads seed the state, a concurrent seed of the same data wins
+        keys = [self.capacity_key, self.paid_key, self.key]
+        result = self._script(source)(keys=keys, args=args, client=self.redis)
+        if result == -1:
+            self._script(SEED_SCRIPT)(
+                keys=keys,
+                args=[STATE_TIME, self._max_seats(), *self._paid_ids()],
+                client=self.redis,
+            )
+            result = self._script(source)(keys=keys, args=args, client=self.redis)
+        return result
+
+    def hold(self, registration_id):
+        """Hold (or refresh) a seat for the registration, False when the event is full."""
+        now = time.time()
+        return bool(
+            self._run(
+                HOLD_SCRIPT,
+                [
+                    now,
+                    now + settings.SEAT_HOLD_TIME,
+                    registration_id,
+                    settings.SEAT_HOLD_TIME,
+                    STATE_TIME,
+                ],
+            )
+        )
+
+    def release(self, registration_id):
+        """Drop the hold of the registration, after a failed payment."""
+        return bool(
+            self._script(RELEASE_SCRIPT)(
+                keys=[self.key], args=[registration_id], client=self.redis
+            )
+        )
+
+    def confirm(self, registration):
+        """
+        Mark the registration as paid and drop its hold. False when the hold
+        expired and the seat went to someone else, the registration stays unpaid.
+        """
+        from gathering.models import GatheringUser
+        from gathering.tasks import reconcile_seats
+
+        confirmed = self._run(
+            CONFIRM_SCRIPT, [time.time(), registration.pk, STATE_TIME]
+        )
+        if not confirmed:
+            return False
+        try:
+            with transaction.atomic():
+                # the registration row only, paid_seats is counted afterwards
+                if GatheringUser.objects.filter(
+                    pk=registration.pk, is_paid=False
+                ).update(is_paid=True):
+                    enqueue(reconcile_seats, self.gathering.pk)
+        except Exception:
+            if confirmed == 1:
+                self.redis.srem(self.paid_key, registration.pk)
+            raise
+        registration.is_paid = True
+        return True
+
+    def reconcile(self):
+        """
+        Bring the seeded state up to date with the database: max_seats, paid
+        registrations, and no paid seats of deleted registrations.
+        """
+        from gathering.models import GatheringUser
+
+        self._script(RECONCILE_SCRIPT)(
+            keys=[self.capacity_key, self.paid_key],
+            args=[self._max_seats(), *self._paid_ids()],
+            client=self.redis,
+        )
+        members = [int(pk) for pk in self.redis.smembers(self.paid_key)]
+        existing = set(
+            GatheringUser.objects.filter(pk__in=members).values_list("pk", flat=True)
+        )
+        deleted = [pk for pk in members if pk not in existing]
+        if deleted:
+            self.redis.srem(self.paid_key, *deleted)
+
+    def set_capacity(self, max_seats):
+        self.redis.set(self.capacity_key, max_seats, xx=True, keepttl=True)
+
+    def forget_paid(self, registration_id):
+        """Give the seat of a deleted paid registration back."""
+        self.redis.srem(self.paid_key, registration_id)
+
+    def held_seats(self):
+        return self._script(COUNT_SCRIPT)(
+            keys=[self.key], args=[time.time()], client=self.redis
+        )
@@ -0,0 +1,111 @@
+import asyncio
+from itertools import islice
+import aiohttp
+import requests
+from celery import shared_task
+from zeep.exceptions import Fault, TransportError
+from accounts.tasks import get_sms_client, number, password, sent_rec_id, username
+from adapter.melipayamak import Api
+from .models import Gathering, GatheringUser
+from .services.seat_counters import rebuild_seat_counters
+from .services.seat_reservation import SeatReservation
+
+# recipients per chunk task, one multi recipient request for plain text
+CHUNK_SIZE = 100
+# chunk tasks per worker, i.e. at most CHUNK_SIZE * 30 messages a minute
+CHUNK_RATE_LIMIT = "30/m"
+SMS_ERRORS = (
+    requests.RequestException,
+    aiohttp.ClientError,
+    asyncio.TimeoutError,
+    Fault,
+    TransportError,
+)
+
+
+def failed_text_recipients(phones, result):
+    # SendSms answers with SendSmsResult (1 is ok) and one recId per recipient.
+    if result is None or result["SendSmsResult"] != 1:
+        return phones
+    rec_ids = result["recId"]
+    rec_ids = list(getattr(rec_ids, "long", rec_ids) or [])
+    rec_ids += [None] * (len(phones) - len(rec_ids))
+    return [
+        phone for phone, rec_id in zip(phones, rec_ids) if sent_rec_id(rec_id) is None
+    ]
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+async def send_patterns(phones, body_id, args):
+    async with Api(username, password).sms("rest", "async") as client:
+        return await client.send_many(
+            ({"text": args, "to": phone, "bodyId": body_id} for phone in phones),
+            method="send_by_base_number",
+        )
+
+
+@shared_task(bind=True, rate_limit=CHUNK_RATE_LIMIT, max_retries=5)
+def send_notification_chunk(self, phones, body_id=None, args=None, text=None):
+    """
+    Send `text` to all of `phones` in one request, or the `body_id` pattern
+    with `args` to each of them over one connection pool (patterns are single
+    recipient). Only the recipients the panel did not accept (no recId) are
+    retried, with backoff.
+    """
+    countdown = 2**self.request.retries * 10
+    if text is not None:
+        try:
+            result = get_sms_client("soap").send2(phones, number, text)
+        except SMS_ERRORS as e:
+            raise self.retry(exc=e, countdown=countdown)
+        failed = failed_text_recipients(phones, result)
+    else:
+        results = asyncio.run(send_patterns(phones, body_id, args or []))
+        failed = [
+            phone
+            for phone, result in zip(phones, results)
+            if isinstance(result, Exception) or sent_rec_id(result) is None
+        ]
+    if failed:
+        raise self.retry(args=(failed, body_id, args, text), countdown=countdown)
+    return len(phones)
+
+
+@shared_task
+def notify_gathering_users(
+    gathering_id, body_id=None, args=None, text=None, paid_only=False
+):
+    """
+    Notify the registrants of a gathering with plain `text` or with the
+    `body_id` pattern and its `args`. Recipients are streamed from the
+    database and sent in chunks of CHUNK_SIZE, one task per chunk.
+    """
+    if (body_id is None) == (text is None):
+        raise ValueError("Pass exactly one of body_id and text")
+    registrations = GatheringUser.objects.filter(gathering_id=gathering_id)
+    if paid_only:
+        registrations = registrations.filter(is_paid=True)
+    phones = (
+        registrations.order_by("pk")
+        .values_list("user__phone", flat=True)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    chunks = 0
+    for chunks, chunk in enumerate(chunked(phones, CHUNK_SIZE), 1):
+        send_notification_chunk.delay(chunk, body_id, args, text)
+    return chunks
+
+
+@shared_task
+def reconcile_seats(gathering_id):
+    """
+    Count the seats confirmed in Redis into Gathering.paid_seats, and correct
+    the Redis seat state of the gathering from its registrations.
+    """
+    rebuild_seat_counters([gathering_id])
+    SeatReservation(Gathering(pk=gathering_id)).reconcile()
@@ -0,0 +1,360 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+    skipUnlessDBFeature,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from unittest import mock, skipUnless
+from gathering.models import Discount, Gathering, GatheringUser, Photo
+from gathering.postgres import create_postgres_objects
+from utils.constants import Errors
+import datetime
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+def create_gatherings(count, **extra_fields):
+    return [
+        Gathering.objects.create(
+            title=f"test_title_{i}",
+            description="test_description",
+            poster="test.png",
+            date=timezone.now() + datetime.timedelta(days=7),
+            max_seats=10,
+            **extra_fields,
+        )
+        for i in range(count)
+    ]
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QueryCountTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(phone="09000000000", password="a/@1234567")
+        self.presenter = User.objects.create_user(
+            phone="09000000001", password="a/@1234567"
+        )
+        self.client = APIClient()
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        # django-silk records every request in its own tables, skip those.
+        return len(
+            [query for query in context.captured_queries if "silk_" not in query["sql"]]
+        )
+
+    def add_gatherings(self, count):
+        gatherings = create_gatherings(count)
+        for gathering in gatherings:
+            gathering.presenter.add(self.presenter)
+        return gatherings
+
+    def test_gathering_list_query_count_is_constant(self):
+        url = reverse("gathering:api-v1:event-list")
+        self.add_gatherings(1)
+        single = self.count_queries(url)
+        self.add_gatherings(99)
+        self.assertEqual(single, self.count_queries(url))
+
+    def test_registration_list_query_count_is_constant(self):
+        url = reverse("gathering:api-v1:my-event-list")
+        self.client.force_authenticate(self.user)
+        for gathering in self.add_gatherings(1):
+            GatheringUser.objects.create(user=self.user, gathering=gathering)
+        single = self.count_queries(url)
+        for gathering in self.add_gatherings(99):
+            GatheringUser.objects.create(user=self.user, gathering=gathering)
+        self.assertEqual(single, self.count_queries(url))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@skipUnlessDBFeature("has_select_for_update")
+class ConcurrentRegistrationTests(TransactionTestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.users = [
+            User.objects.create_user(phone=f"090000000{i:02}", password="a/@1234567")
+            for i in range(20)
+        ]
+        self.gathering = create_gatherings(1)[0]
+        Gathering.objects.filter(pk=self.gathering.pk).update(max_seats=3)
+
+    def register(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        try:
+            return client.post(
+                reverse("gathering:api-v1:my-event-list"),
+                {"gathering": self.gathering.pk},
+            )
+        finally:
+            connection.close()
+
+    def test_concurrent_registrations_never_oversell(self):
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            responses = list(executor.map(self.register, self.users))
+
+        created = [r for r in responses if r.status_code == 201]
+        rejected = [r for r in responses if r.status_code == 400]
+        self.assertEqual(len(created), 3)
+        self.assertEqual(len(rejected), 17)
+        for response in rejected:
+            self.assertEqual(
+                response.json()["detail"], [Errors.Full_capacity["detail"]]
+            )
+        self.gathering.refresh_from_db()
+        self.assertEqual(self.gathering.registered_seats, 3)
+        self.assertEqual(
+            GatheringUser.objects.filter(gathering=self.gathering).count(), 3
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.user = User.objects.create_user(phone="09000000000", password="a/@1234567")
+        self.gathering = create_gatherings(1)[0]
+        self.client = APIClient()
+
+    def get_detail(self):
+        url = reverse(
+            "gathering:api-v1:event-detail", kwargs={"pk": self.gathering.pk}
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        queries = [q["sql"] for q in context.captured_queries]
+        return response.json(), [
+            sql for sql in queries if sql.startswith("SELECT") and "gathering_" in sql
+        ]
+
+    def test_cached_detail_skips_database(self):
+        self.get_detail()
+        _, queries = self.get_detail()
+        # Only the ETag validators are read, the gathering row is not serialized.
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0].startswith("SELECT COUNT("))
+
+    def test_registration_invalidates_cached_detail(self):
+        data, _ = self.get_detail()
+        self.assertEqual(data["filled_seats"], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            GatheringUser.objects.create(user=self.user, gathering=self.gathering)
+        data, _ = self.get_detail()
+        self.assertEqual(data["filled_seats"], 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.user = User.objects.create_user(phone="09000000000", password="a/@1234567")
+        self.gathering = create_gatherings(1)[0]
+        self.client = APIClient()
+
+    def assert_not_modified(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ETag", response)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        return response["ETag"]
+
+    def test_gathering_detail_etag_follows_seats(self):
+        url = reverse(
+            "gathering:api-v1:event-detail", kwargs={"pk": self.gathering.pk}
+        )
+        etag = self.assert_not_modified(url)
+        GatheringUser.objects.create(user=self.user, gathering=self.gathering)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_gathering_detail_if_modified_since(self):
+        url = reverse(
+            "gathering:api-v1:event-detail", kwargs={"pk": self.gathering.pk}
+        )
+        response = self.client.get(url)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_gathering_list_etag_follows_deletes(self):
+        older = create_gatherings(1)[0]
+        url = reverse("gathering:api-v1:event-list")
+        etag = self.assert_not_modified(url)
+        # a delete leaves the newest updated_date as it was
+        self.assertNotIn("Last-Modified", self.client.get(url))
+
+        older.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_get_of_missing_object_is_404(self):
+        url = reverse("gathering:api-v1:event-detail", kwargs={"pk": 0})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("ETag", response)
+
+    def test_presenter_rename_changes_detail(self):
+        self.gathering.presenter.add(self.user)
+        url = reverse(
+            "gathering:api-v1:event-detail", kwargs={"pk": self.gathering.pk}
+        )
+        etag = self.assert_not_modified(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = "renamed"
+            self.user.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["presenter"], [self.user.fullname])
+
+        etag = response["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.gathering_set.clear()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()["presenter"], [])
+
+    def test_discount_and_images_etag(self):
+        Discount.objects.create(code="test", gathering=self.gathering, status=True)
+        Photo.objects.create(gathering=self.gathering, image="test.png")
+        self.assert_not_modified(
+            reverse("gathering:api-v1:discount-check", kwargs={"get_discount": "test"})
+        )
+        self.assert_not_modified(reverse("gathering:api-v1:images-list"))
+
+    def test_discount_etag_follows_gathering(self):
+        Discount.objects.create(code="test", gathering=self.gathering, status=True)
+        url = reverse(
+            "gathering:api-v1:discount-check", kwargs={"get_discount": "test"}
+        )
+        etag = self.assert_not_modified(url)
+
+        self.gathering.price = 5000
+        self.gathering.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["gathering"]["price"], 5000)
+
+    def test_replaced_image_changes_etag(self):
+        photo = Photo.objects.create(gathering=self.gathering, image="test.png")
+        url = reverse("gathering:api-v1:images-list")
+        etag = self.assert_not_modified(url)
+
+        photo.image = "other.png"
+        photo.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.gatherings = create_gatherings(25)
+        # Half of the events share a date, so the id has to break the ties.
+        Gathering.objects.filter(pk__in=[g.pk for g in self.gatherings[::2]]).update(
+            date=timezone.now()
+        )
+        self.client = APIClient()
+
+    def walk(self, url):
+        ids, pages = [], []
+        while url:
+            data = self.client.get(url).json()
+            ids += [row["id"] for row in data["results"]]
+            pages.append(data)
+            url = data["next"]
+        return ids, pages
+
+    def test_pages_follow_ordering_without_gaps(self):
+        url = reverse("gathering:api-v1:event-list")
+        for ordering in (["-date", "-id"], ["date", "id"], ["-is_held", "-id"]):
+            ids, pages = self.walk(f"{url}?page_size=10&ordering={ordering[0]}")
+            expected = Gathering.objects.order_by(*ordering)
+            self.assertEqual(ids, list(expected.values_list("id", flat=True)))
+            self.assertEqual(len(pages), 3)
+
+    def test_previous_link_returns_previous_page(self):
+        url = reverse("gathering:api-v1:event-list") + "?page_size=10"
+        first = self.client.get(url).json()
+        second = self.client.get(first["next"]).json()
+        self.assertEqual(self.client.get(second["previous"]).json(), first)
+
+    def test_invalid_cursor(self):
+        url = reverse("gathering:api-v1:event-list") + "?cursor=invalid"
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_staff_list_is_not_paginated(self):
+        staff = get_user_model().objects.create_user(
+            phone="09000000000", password="a/@1234567", is_staff=True
+        )
+        self.client.force_authenticate(staff)
+        response = self.client.get(reverse("gathering:api-v1:manage-event-list"))
+        self.assertEqual(len(response.json()), 25)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@skipUnless(connection.vendor == "postgresql", "full text search needs Postgres")
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.in_title, self.in_description, self.other = create_gatherings(3)
+        # Arabic kaf and yeh, as typed on an Arabic keyboard.
+        self.in_title.title = "كلاس پايتون"
+        self.in_title.save()
+        self.in_description.description = "یک کلاس عملی"
+        self.in_description.save()
+        presenter = get_user_model().objects.create_user(
+            phone="09000000000", password="a/@1234567", first_name="Hamidreza"
+        )
+        self.other.presenter.add(presenter)
+
+    def search(self, term, **params):
+        response = self.client.get(
+            reverse("gathering:api-v1:event-list"), {"search": term, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_failed_search_setup_fails_the_migrate(self):
+        # search_vector would stay empty and every search find nothing
+        statements = ["SELECT gathering_no_such_function()"]
+        with mock.patch("gathering.postgres.POSTGRES_STATEMENTS", statements):
+            with self.assertRaises(DatabaseError):
+                create_postgres_objects(sender=None)
+
+    def test_search_is_ranked_and_normalized(self):
+        ids = [row["id"] for row in self.search("کلاس")["results"]]
+        self.assertEqual(ids, [self.in_title.id, self.in_description.id])
+
+    def test_search_presenter_name_prefix(self):
+        ids = [row["id"] for row in self.search("hamid")["results"]]
+        self.assertEqual(ids, [self.other.id])
+
+    def test_search_results_paginate_by_rank(self):
+        page = self.search("کلاس", page_size=1)
+        ids = [row["id"] for row in page["results"]]
+        page = self.client.get(page["next"]).json()
+        ids += [row["id"] for row in page["results"]]
+        self.assertEqual(ids, [self.in_title.id, self.in_description.id])
+        self.assertIsNone(page["next"])
@@ -1,7 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
-from gathering.models import Gathering
+from gathering.models import Gathering, GatheringUser
+from gathering.services.response_cache import detail_version_key, get_version
 from datetime import datetime
+from io import StringIO
 
 
 class EventModelsTests(TestCase):
@@ -35,3 +38,107 @@ class EventModelsTests(TestCase):
         self.assertFalse(event_obj.is_held)
         self.assertFalse(event_obj.is_held)
         self.assertTrue(event_obj.is_online)
+
+
+class SeatCounterTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.users = [
+            User.objects.create_user(phone=f"0900000000{i}", password="a/@1234567")
+            for i in range(3)
+        ]
+        self.event_obj = Gathering.objects.create(
+            title="test_title",
+            description="test_description",
+            poster="test.png",
+            price=1000,
+            date=datetime.now(),
+            max_seats=5,
+        )
+
+    def register(self, user, is_paid=False):
+        return GatheringUser.objects.create(
+            user=user, gathering=self.event_obj, is_paid=is_paid
+        )
+
+    def test_counters_follow_create_pay_and_delete(self):
+        first = self.register(self.users[0])
+        self.register(self.users[1], is_paid=True)
+        self.event_obj.refresh_from_db()
+        self.assertEqual(self.event_obj.registered_seats, 2)
+        self.assertEqual(self.event_obj.paid_seats, 1)
+
+        self.assertTrue(first.mark_as_paid())
+        self.assertFalse(first.mark_as_paid())
+        self.event_obj.refresh_from_db()
+        self.assertEqual(self.event_obj.paid_seats, 2)
+
+        first.delete()
+        self.event_obj.refresh_from_db()
+        self.assertEqual(self.event_obj.registered_seats, 1)
+        self.assertEqual(self.event_obj.paid_seats, 1)
+
+    def test_saving_stale_gathering_keeps_counters(self):
+        self.register(self.users[0])
+        self.event_obj.title = "new_title"
+        self.event_obj.save()
+        self.event_obj.refresh_from_db()
+        self.assertEqual(self.event_obj.registered_seats, 1)
+
+    def test_held_event_drops_unpaid_registrations(self):
+        self.register(self.users[0])
+        self.register(self.users[1], is_paid=True)
+        self.event_obj.is_held = True
+        self.event_obj.save()
+        self.event_obj.refresh_from_db()
+        self.assertEqual(self.event_obj.registered_seats, 1)
+        self.assertEqual(self.event_obj.filled_seats, 1)
+
+    def test_rebuild_seat_counters_command(self):
+        self.register(self.users[0])
+        self.register(self.users[1], is_paid=True)
+        Gathering.objects.update(registered_seats=0, paid_seats=0)
+        call_command("rebuild_seat_counters", stdout=StringIO())
+        self.event_obj.refresh_from_db()
+        self.assertEqual(self.event_obj.registered_seats, 2)
+        self.assertEqual(self.event_obj.paid_seats, 1)
+
+    def test_admin_edits_move_counters(self):
+        other = Gathering.objects.create(
+            title="other",
+            description="other",
+            poster="test.png",
+            price=1000,
+            date=datetime.now(),
+            max_seats=5,
+        )
+        registration = self.register(self.users[0])
+        registration.is_paid = True
+        registration.save()
+        self.event_obj.refresh_from_db()
+        self.assertEqual(self.event_obj.paid_seats, 1)
+
+        registration.gathering = other
+        registration.save()
+        registration.check_in = True
+        registration.save()
+        self.event_obj.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(
+            (self.event_obj.registered_seats, self.event_obj.paid_seats), (0, 0)
+        )
+        self.assertEqual((other.registered_seats, other.paid_seats), (1, 1))
+
+    def test_rebuild_seat_counters_bumps_cache_version(self):
+        self.register(self.users[0])
+        Gathering.objects.update(registered_seats=0)
+        key = detail_version_key(self.event_obj.pk)
+        version = get_version(key)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("rebuild_seat_counters", stdout=StringIO())
+        self.assertEqual(get_version(key), version + 1)
+
+        # gatherings with right counters are left alone
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("rebuild_seat_counters", stdout=StringIO())
+        self.assertEqual(get_version(key), version + 1)
@@ -0,0 +1,128 @@
+from azbankgateways.models import Bank
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from gathering.models import Discount, Gathering, GatheringUser
+from unittest import skipUnless
+from gathering.api.v1.filters import FullTextSearchFilter
+from utils.pagination import KeysetPagination
+import datetime
+
+
+@skipUnless(connection.vendor == "postgresql", "query plans are checked on Postgres")
+class QueryPlanTests(TestCase):
+    """
+    The hot gathering queries must be answered from their index.
+    Sequential scans are disabled for the session, so the planner only falls
+    back to one when no usable index exists. Each case also names the index it
+    expects, so an overlapping index can't stand in for it.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        now = timezone.now()
+        users = User.objects.bulk_create(
+            User(phone=f"09{i:09}", first_name="test", last_name="test")
+            for i in range(200)
+        )
+        gatherings = Gathering.objects.bulk_create(
+            Gathering(
+                title=f"test_title_{i}",
+                description="test_description",
+                poster="test.png",
+                price=1000,
+                date=now + datetime.timedelta(hours=i),
+                max_seats=100,
+            )
+            for i in range(200)
+        )
+        GatheringUser.objects.bulk_create(
+            GatheringUser(user=user, gathering=gathering, is_paid=(i + j) % 3 == 0)
+            for i, user in enumerate(users)
+            for j, gathering in enumerate(gatherings[:20])
+        )
+        Discount.objects.bulk_create(
+            Discount(code=f"code_{i}_{j}", gathering=gathering, status=j % 2 == 0)
+            for i, gathering in enumerate(gatherings)
+            for j in range(10)
+        )
+        cls.user, cls.gathering = users[0], gatherings[0]
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assert_no_seq_scan(self, queryset, index):
+        plan = queryset.explain()
+        self.assertNotIn("Seq Scan", plan, plan)
+        self.assertIn(index, plan, plan)
+
+    def test_paid_registrations_of_gathering(self):
+        self.assert_no_seq_scan(
+            GatheringUser.objects.filter(gathering=self.gathering, is_paid=True),
+            "gatheringuser_paid_idx",
+        )
+
+    def test_registrations_of_gathering(self):
+        self.assert_no_seq_scan(
+            GatheringUser.objects.filter(gathering=self.gathering, is_paid=False),
+            "gatheringuser_paid_idx",
+        )
+
+    def test_registration_of_bank_record(self):
+        # the index Django creates for the foreign key
+        self.assert_no_seq_scan(
+            GatheringUser.objects.filter(bank_gateway=Bank(pk=1)),
+            "gathering_gatheringuser_bank_gateway_id",
+        )
+
+    def test_registrations_of_user_page(self):
+        self.assert_no_seq_scan(
+            GatheringUser.objects.filter(user=self.user).order_by(
+                "-created_date", "-id"
+            )[:20],
+            "gatheringuser_user_created_idx",
+        )
+
+    def test_discount_validation(self):
+        # the unique constraint of Discount.code
+        self.assert_no_seq_scan(
+            Discount.objects.filter(
+                code="code_0_0", gathering=self.gathering, status=True
+            ),
+            "gathering_discount_code",
+        )
+        self.assert_no_seq_scan(
+            Discount.objects.filter(gathering=self.gathering, status=True),
+            "discount_gathering_status_idx",
+        )
+
+    def test_gathering_page_by_date(self):
+        self.assert_no_seq_scan(
+            Gathering.objects.filter(date__lt=timezone.now()).order_by("-date", "-id")[
+                :20
+            ],
+            "gathering_date_id_idx",
+        )
+
+    def test_gathering_deep_page_starts_at_the_cursor(self):
+        ordering = ["-date", "-id"]
+        position = [self.gathering.date, self.gathering.pk]
+        plan = (
+            Gathering.objects.filter(KeysetPagination().seek(ordering, position))
+            .order_by(*ordering)[:20]
+            .explain()
+        )
+        self.assertIn("gathering_date_id_idx", plan, plan)
+        self.assertRegex(plan, r"Index Cond: \(date <=", plan)
+
+    def test_gathering_full_text_search(self):
+        query = FullTextSearchFilter().get_search_query(["title_1"])
+        self.assert_no_seq_scan(
+            Gathering.objects.filter(search_vector=query),
+            "gathering_search_vector_idx",
+        )
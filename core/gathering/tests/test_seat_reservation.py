@@ -0,0 +1,139 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from gathering.models import Gathering, GatheringUser
+from gathering.services.seat_reservation import SeatReservation
+from gathering.tasks import reconcile_seats
+from outbox.models import OutboxMessage
+import time
+
+
+class SeatReservationTests(TestCase):
+    def setUp(self):
+        self.gathering = Gathering.objects.create(
+            title="test_title",
+            description="test_description",
+            poster="test.png",
+            price=1000,
+            date=timezone.now(),
+            max_seats=2,
+        )
+        self.reservation = SeatReservation(self.gathering)
+        self.addCleanup(
+            self.reservation.redis.delete,
+            self.reservation.key,
+            self.reservation.capacity_key,
+            self.reservation.paid_key,
+        )
+
+    def test_hold_is_limited_to_free_seats(self):
+        self.assertTrue(self.reservation.hold(1))
+        self.assertTrue(self.reservation.hold(2))
+        self.assertFalse(self.reservation.hold(3))
+        # Holding again only refreshes the expiry of the existing hold.
+        self.assertTrue(self.reservation.hold(2))
+
+        self.assertTrue(self.reservation.release(1))
+        self.assertTrue(self.reservation.hold(3))
+        self.assertEqual(self.reservation.held_seats(), 2)
+
+    def test_paid_seats_are_not_available(self):
+        # seeded from the paid registrations in the database
+        registration = self.register("09000000001")
+        GatheringUser.objects.filter(pk=registration.pk).update(is_paid=True)
+        self.assertTrue(self.reservation.hold(1001))
+        self.assertFalse(self.reservation.hold(1002))
+        # a paid registration keeps its seat
+        self.assertTrue(self.reservation.hold(registration.pk))
+
+    def queries(self, call):
+        with CaptureQueriesContext(connection) as context:
+            self.assertTrue(call())
+        # django-silk explains the queries in DEBUG, skip those.
+        return [
+            query["sql"]
+            for query in context.captured_queries
+            if not query["sql"].startswith("EXPLAIN")
+        ]
+
+    def test_no_gathering_row_lock(self):
+        registration = self.register("09000000001")
+        # seeding reads max_seats and the paid registrations
+        self.assertEqual(len(self.queries(lambda: self.reservation.hold(1001))), 2)
+        self.assertEqual(
+            self.queries(lambda: self.reservation.hold(registration.pk)), []
+        )
+        queries = self.queries(lambda: self.reservation.confirm(registration))
+        self.assertFalse([sql for sql in queries if "FOR UPDATE" in sql])
+        self.assertFalse([sql for sql in queries if '"gathering_gathering"' in sql])
+
+    def test_capacity_follows_edits(self):
+        self.assertTrue(self.reservation.hold(1))
+        self.assertTrue(self.reservation.hold(2))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.gathering.max_seats = 3
+            self.gathering.save()
+        self.assertTrue(self.reservation.hold(3))
+
+    @override_settings(SEAT_HOLD_TIME=1)
+    def test_expired_hold_frees_the_seat(self):
+        self.assertTrue(self.reservation.hold(1))
+        self.assertTrue(self.reservation.hold(2))
+        time.sleep(1.1)
+        self.assertTrue(self.reservation.hold(3))
+        self.assertEqual(self.reservation.held_seats(), 1)
+
+    def register(self, phone):
+        user = get_user_model().objects.create_user(phone=phone, password="test")
+        return GatheringUser.objects.create(user=user, gathering=self.gathering)
+
+    def paid_seats(self):
+        # counted by the enqueued task
+        for message in OutboxMessage.objects.filter(task=reconcile_seats.name):
+            reconcile_seats(*message.args)
+            message.delete()
+        self.gathering.refresh_from_db()
+        return self.gathering.paid_seats
+
+    def test_confirm_turns_the_hold_into_a_paid_seat(self):
+        registration = self.register("09000000001")
+        self.assertTrue(self.reservation.hold(registration.pk))
+        self.assertTrue(self.reservation.confirm(registration))
+
+        self.assertEqual(self.reservation.held_seats(), 0)
+        self.assertEqual(self.paid_seats(), 1)
+        # a repeated callback does not count the seat twice
+        self.assertTrue(self.reservation.confirm(registration))
+        self.assertEqual(self.paid_seats(), 1)
+
+    @override_settings(SEAT_HOLD_TIME=1)
+    def test_expired_hold_is_not_confirmed_when_the_seat_is_gone(self):
+        late, first, second = (self.register(f"0900000000{i}") for i in range(1, 4))
+        self.assertTrue(self.reservation.hold(late.pk))
+        time.sleep(1.1)
+        self.assertTrue(self.reservation.hold(first.pk))
+        self.assertTrue(self.reservation.hold(second.pk))
+
+        self.assertFalse(self.reservation.confirm(late))
+        late.refresh_from_db()
+        self.assertFalse(late.is_paid)
+        self.assertEqual(self.paid_seats(), 0)
+
+        # a seat that is still free is fine without the hold
+        self.assertTrue(self.reservation.release(second.pk))
+        self.assertTrue(self.reservation.confirm(late))
+        self.assertEqual(self.paid_seats(), 1)
+
+    def test_deleted_paid_registration_frees_the_seat(self):
+        first, second, third = (self.register(f"0900000000{i}") for i in range(1, 4))
+        for registration in (first, second):
+            self.assertTrue(self.reservation.hold(registration.pk))
+            self.assertTrue(self.reservation.confirm(registration))
+        self.assertFalse(self.reservation.hold(third.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(self.reservation.hold(third.pk))
+        self.assertEqual(self.paid_seats(), 1)
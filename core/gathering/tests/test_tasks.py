@@ -0,0 +1,114 @@
+from adapter.melipayamak.sms import RestAsync
+from benchmarks.stub_server import StubServer
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from gathering.models import Gathering, GatheringUser
+from gathering.tasks import notify_gathering_users, send_notification_chunk
+from celery.exceptions import Retry
+from unittest import mock
+
+
+class NotifyGatheringUsersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.gathering = Gathering.objects.create(
+            title="test_title",
+            description="test_description",
+            poster="test.png",
+            price=1000,
+            date=timezone.now(),
+            max_seats=300,
+        )
+        users = User.objects.bulk_create(
+            User(phone=f"09{i:09}", first_name="test", last_name="test")
+            for i in range(250)
+        )
+        GatheringUser.objects.bulk_create(
+            GatheringUser(user=user, gathering=cls.gathering, is_paid=i % 2 == 0)
+            for i, user in enumerate(users)
+        )
+
+    def notify(self, **kwargs):
+        with mock.patch.object(send_notification_chunk, "delay") as delay:
+            chunks = notify_gathering_users(self.gathering.pk, **kwargs)
+        self.assertEqual(chunks, delay.call_count)
+        return [call.args for call in delay.call_args_list]
+
+    def test_recipients_are_sent_in_chunks(self):
+        calls = self.notify(body_id=1234, args=["test_title"])
+
+        self.assertEqual([len(call[0]) for call in calls], [100, 100, 50])
+        phones = [phone for call in calls for phone in call[0]]
+        self.assertEqual(len(set(phones)), 250)
+        self.assertEqual(calls[0][1:], (1234, ["test_title"], None))
+
+    def test_paid_only(self):
+        calls = self.notify(text="test", paid_only=True)
+
+        self.assertEqual([len(call[0]) for call in calls], [100, 25])
+        self.assertEqual(calls[0][1:], (None, None, "test"))
+
+    def test_body_id_or_text_is_required(self):
+        with self.assertRaises(ValueError):
+            notify_gathering_users(self.gathering.pk)
+
+
+class SendNotificationChunkTests(TestCase):
+    phones = ["09000000001", "09000000002", "09000000003", "09000000004"]
+
+    def setUp(self):
+        patcher = mock.patch.object(send_notification_chunk, "retry", side_effect=Retry)
+        self.retry = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def retried_phones(self):
+        return self.retry.call_args.kwargs["args"][0]
+
+    def test_only_refused_patterns_are_retried(self):
+        results = [
+            {"Value": "1234567890123456", "RetStatus": 1},
+            {"Value": "11", "RetStatus": 0},
+            ConnectionError(),
+            {"Value": "1234567890123457", "RetStatus": 1},
+        ]
+        with mock.patch("gathering.tasks.send_patterns", return_value=results):
+            with self.assertRaises(Retry):
+                send_notification_chunk(self.phones, body_id=1234, args=["test"])
+
+        self.assertEqual(self.retried_phones(), self.phones[1:3])
+
+    def test_only_refused_text_recipients_are_retried(self):
+        soap = mock.Mock()
+        soap.send2.return_value = {
+            "SendSmsResult": 1,
+            "recId": [1234567890123456, 0, 1234567890123457, -1],
+        }
+        with mock.patch("gathering.tasks.get_sms_client", return_value=soap):
+            with self.assertRaises(Retry):
+                send_notification_chunk(self.phones, text="test")
+            self.assertEqual(self.retried_phones(), [self.phones[1], self.phones[3]])
+
+            # a refused request retries every recipient
+            soap.send2.return_value = {"SendSmsResult": 0, "recId": None}
+            with self.assertRaises(Retry):
+                send_notification_chunk(self.phones, text="test")
+            self.assertEqual(self.retried_phones(), self.phones)
+
+    def test_delivered_chunk(self):
+        results = [{"Value": "1234567890123456", "RetStatus": 1}] * 4
+        with mock.patch("gathering.tasks.send_patterns", return_value=results):
+            self.assertEqual(
+                send_notification_chunk(self.phones, body_id=1234, args=[]), 4
+            )
+        self.retry.assert_not_called()
+
+    def test_patterns_the_panel_accepted_are_not_retried(self):
+        # through the real REST client, the panel answers with a json body
+        with StubServer() as server:
+            with mock.patch.object(RestAsync, "PATH", server.url + "/%s"):
+                sent = send_notification_chunk(self.phones, body_id=1234, args=[])
+
+        self.assertEqual(sent, 4)
+        self.retry.assert_not_called()
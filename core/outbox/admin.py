@@ -0,0 +1,12 @@
+from django.contrib import admin
+from outbox.models import OutboxMessage
+
+
+class OutboxMessageAdmin(admin.ModelAdmin):
+    search_fields = ["task"]
+    list_display = ("task", "attempts", "created_date")
+    list_filter = ["attempts"]
+    readonly_fields = ["created_date"]
+
+
+admin.site.register(OutboxMessage, OutboxMessageAdmin)
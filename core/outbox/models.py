@@ -0,0 +1,22 @@
+from django.db import models
+
+
+# Define a model for the celery tasks waiting for their transaction to commit.
+class OutboxMessage(models.Model):
+    """
+    A celery task call written in the transaction of the change that causes
+    it, see outbox.relay. The row is deleted once the task is published.
+    After MAX_ATTEMPTS failed publishes it is not tried anymore and stays
+    until it is fixed or deleted in the admin.
+    """
+
+    MAX_ATTEMPTS = 5
+
+    task = models.CharField(max_length=255)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.task} ({self.created_date})"
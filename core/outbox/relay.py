@@ -0,0 +1,80 @@
+import logging
+from contextlib import contextmanager
+from celery import current_app
+from django.db import transaction
+from django.db.models import F
+from kombu.exceptions import OperationalError
+from outbox.models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+# messages published per transaction and broker connection
+BATCH_SIZE = 100
+# seconds the after commit flush waits for the broker to accept a connection
+CONNECT_TIMEOUT = 0.5
+
+
+def enqueue(task, *args, **kwargs):
+    """
+    Call the celery `task` once the current transaction commits. The call is
+    a row of that transaction, so a rollback drops it and a broker outage
+    does not fail the transaction: the row stays until the relay_outbox task
+    publishes it. Arguments must be JSON serializable.
+    """
+    OutboxMessage.objects.create(task=task.name, args=list(args), kwargs=kwargs)
+    # the request does not wait for a broker that is down, relay_outbox
+    # publishes what this flush could not
+    transaction.on_commit(lambda: flush(retry=False))
+
+
+@contextmanager
+def producer_for(retry):
+    if retry:
+        with current_app.producer_or_acquire() as producer:
+            yield producer
+        return
+    # a connection of its own, without the connect retries of the pool
+    with current_app.connection_for_write(
+        connect_timeout=CONNECT_TIMEOUT, transport_options={"max_retries": 0}
+    ) as connection:
+        yield current_app.amqp.Producer(connection)
+
+
+def flush(limit=BATCH_SIZE, retry=True):
+    """
+    Publish up to `limit` messages over one broker connection and delete them,
+    returns how many were published. Rows another flush is publishing are
+    skipped. Delivery is at least once: a message is published again when
+    the delete does not commit. A message that fails to publish while the
+    broker is up (e.g. its task was renamed) counts an attempt, after
+    OutboxMessage.MAX_ATTEMPTS it is left aside for the admin.
+    """
+    sent, failed = [], []
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.filter(attempts__lt=OutboxMessage.MAX_ATTEMPTS)
+            .select_for_update(skip_locked=True)
+            .order_by("pk")[:limit]
+        )
+        if not messages:
+            return 0
+        try:
+            with producer_for(retry) as producer:
+                for message in messages:
+                    try:
+                        current_app.tasks[message.task].apply_async(
+                            message.args, message.kwargs, producer=producer, retry=retry
+                        )
+                    except (OperationalError, OSError):
+                        raise
+                    except Exception:
+                        logger.exception("Could not publish outbox message %s", message)
+                        failed.append(message.pk)
+                    else:
+                        sent.append(message.pk)
+        except (OperationalError, OSError):
+            # the broker is down, the rest waits for the next flush
+            pass
+        OutboxMessage.objects.filter(pk__in=sent).delete()
+        OutboxMessage.objects.filter(pk__in=failed).update(attempts=F("attempts") + 1)
+    return len(sent)
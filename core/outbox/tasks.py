@@ -0,0 +1,16 @@
+from celery import shared_task
+from outbox.relay import BATCH_SIZE, flush
+
+
+@shared_task
+def relay_outbox():
+    """
+    Publish the messages an after commit flush could not, e.g. while the
+    broker was down. Run periodically by celery beat.
+    """
+    relayed = 0
+    while True:
+        published = flush()
+        relayed += published
+        if published < BATCH_SIZE:
+            return relayed
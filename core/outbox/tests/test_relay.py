@@ -0,0 +1,103 @@
+from celery import current_app, shared_task
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase
+from kombu.exceptions import OperationalError
+from outbox.models import OutboxMessage
+from outbox.relay import enqueue
+from outbox.tasks import relay_outbox
+from unittest import mock
+import time
+
+
+@shared_task
+def side_effect(value, extra=None):
+    return value
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(side_effect, "apply_async")
+        self.apply_async = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_published_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue(side_effect, 1, extra="x")
+            self.apply_async.assert_not_called()
+
+        self.apply_async.assert_called_once_with(
+            [1], {"extra": "x"}, producer=mock.ANY, retry=False
+        )
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_rollback_drops_the_message(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    enqueue(side_effect, 1)
+                    raise ValueError
+            except ValueError:
+                pass
+
+        self.apply_async.assert_not_called()
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_broker_outage_is_relayed_later(self):
+        self.apply_async.side_effect = OperationalError
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue(side_effect, 1)
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+        self.apply_async.side_effect = None
+        self.assertEqual(relay_outbox(), 1)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_broker_outage_does_not_hold_the_request(self):
+        current_app.conf.broker_write_url = "redis://127.0.0.1:1/1"
+        self.addCleanup(setattr, current_app.conf, "broker_write_url", None)
+        self.apply_async.side_effect = lambda *args, producer, retry: (
+            producer.publish(args, routing_key="outbox_test", retry=retry)
+        )
+
+        started = time.monotonic()
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue(side_effect, 1)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+    def test_unpublishable_message_is_set_aside(self):
+        # e.g. the task was renamed by a deploy after the row was written
+        OutboxMessage.objects.create(task="outbox.tests.removed_task")
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue(side_effect, 1)
+        self.apply_async.assert_called_once()
+
+        for _ in range(OutboxMessage.MAX_ATTEMPTS - 1):
+            enqueue(side_effect, 2)
+            self.assertEqual(relay_outbox(), 1)
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.attempts, OutboxMessage.MAX_ATTEMPTS)
+        self.assertEqual(relay_outbox(), 0)
+
+    def test_relay_in_batches(self):
+        OutboxMessage.objects.bulk_create(
+            OutboxMessage(task=side_effect.name, args=[i]) for i in range(250)
+        )
+        with mock.patch("celery.app.base.Celery.producer_or_acquire") as acquire:
+            self.assertEqual(relay_outbox(), 250)
+
+        self.assertEqual(acquire.call_count, 3)
+        self.assertEqual(
+            [call.args[0] for call in self.apply_async.call_args_list],
+            [[i] for i in range(250)],
+        )
+
+    def test_welcome_sms_waits_for_commit(self):
+        user = get_user_model().objects.create_user(
+            phone="09123456789", password="test", first_name="test"
+        )
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.task, "accounts.tasks.send_welcome")
+        self.assertEqual(message.args, [user.phone, "test"])
@@ -10,6 +10,8 @@ class Errors:
     INVALID_OTP_CODE = generate_error("Invalid otp code")
     OTP_BLANK = generate_error("OTP cant be blank")
     OTP_SPAM = generate_error("Please wait for a while to resend and try again")
+    OTP_LIMIT = generate_error("Too many otp requests, please try again later")
+    OTP_REQUEST_NOT_FOUND = generate_error("Unknown or expired otp request")
     # ===========================================================  Gathering related errors
     GATHERING_HELD = generate_error("gathering has been held")
     Full_capacity = generate_error("All seats are occupied")
@@ -29,12 +31,18 @@ class Errors:
         "Payment has already been made successfully for this object"
     )
     EVENT_IS_FREE = generate_error("This event is free and you cannot pay a fee")
+    SEAT_HOLD_EXPIRED = generate_error(
+        "Your seat hold expired and the event is full, the payment will be refunded"
+    )
 
     # ===========================================================  system related errors
     XSS_ATTACK_DETECTION = generate_error(
         "XSS protection activate, dont use html tags in fields"
     )
     PASSWORD_MISMATCHED = generate_error("Password mismatched")
+    PASSWORD_HASHING_BUSY = generate_error(
+        "The server is busy, please try again in a moment"
+    )
     SMS_PANEL = generate_error(
         "There was an error sending a message from the SMS panel"
     )
@@ -0,0 +1,234 @@
+"""
+Task metrics shared by every web and worker process, kept in one Redis hash and
+rendered in the Prometheus text format.
+
+Every hash field is a ready sample name, e.g.
+`celery_task_runtime_seconds_bucket{task="accounts.tasks.send_otp",le="0.5"}`,
+so the metrics endpoint only has to print the hash.
+"""
+import re
+import threading
+import time
+from datetime import datetime
+from celery import current_task
+from celery.signals import (
+    before_task_publish,
+    task_failure,
+    task_postrun,
+    task_prerun,
+)
+from django_redis import get_redis_connection
+
+KEY = "metrics:tasks"
+# upper bounds (seconds) of the histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+METRICS = {
+    "celery_task_queue_wait_seconds": (
+        "histogram",
+        "Time from publishing a task (or its eta) to a worker starting it",
+    ),
+    "celery_task_runtime_seconds": ("histogram", "Execution time of a task"),
+    "celery_task_provider_seconds": (
+        "histogram",
+        "Time a task spent waiting for the SMS panel",
+    ),
+    "celery_task_failures_total": ("counter", "Tasks that raised an exception"),
+    "sms_provider_call_seconds": ("histogram", "Latency of SMS panel calls"),
+    "sms_provider_failures_total": ("counter", "SMS panel calls that failed"),
+}
+SAMPLE = re.compile(
+    r"^(?P<name>\w+?)(?P<suffix>_bucket|_sum|_count)?\{(?P<labels>.*)\}$"
+)
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+# task id -> [started (monotonic), provider seconds], of the tasks running in
+# this process
+_running = {}
+_lock = threading.Lock()
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def sample(name, labels, **extra):
+    labels = {**labels, **extra}
+    return name + "{%s}" % ",".join(f'{k}="{escape(v)}"' for k, v in labels.items())
+
+
+def observe(name, seconds, **labels):
+    """Add one observation to the `name` histogram."""
+    seconds = max(seconds, 0)
+    pipe = get_redis_connection("default").pipeline(transaction=False)
+    for bound in BUCKETS:
+        pipe.hincrby(
+            KEY,
+            sample(f"{name}_bucket", labels, le=f"{bound:g}"),
+            int(seconds <= bound),
+        )
+    pipe.hincrby(KEY, sample(f"{name}_bucket", labels, le="+Inf"), 1)
+    pipe.hincrbyfloat(KEY, sample(f"{name}_sum", labels), seconds)
+    pipe.hincrby(KEY, sample(f"{name}_count", labels), 1)
+    pipe.execute()
+
+
+def increment(name, **labels):
+    get_redis_connection("default").hincrby(KEY, sample(name, labels), 1)
+
+
+def observe_provider(provider, method, seconds, failed):
+    """
+    Record an SMS panel call, the `on_call` hook of CircuitBreakerClient.
+    The time is added to the provider time of the running task too.
+    """
+    observe("sms_provider_call_seconds", seconds, provider=provider, method=method)
+    if failed:
+        increment("sms_provider_failures_total", provider=provider, method=method)
+    task = current_task
+    running = _running.get(task.request.id) if task else None
+    if running is not None:
+        running[1] += seconds
+
+
+def samples():
+    """The hash as {sample name: value}."""
+    return {
+        key.decode(): value.decode()
+        for key, value in get_redis_connection("default").hgetall(KEY).items()
+    }
+
+
+def render(extra=()):
+    """
+    The metrics in the Prometheus text format. `extra` are more
+    (name, type, help, {sample name: value}) metrics, e.g. gauges.
+    """
+    families = {}
+    for key, value in samples().items():
+        match = SAMPLE.match(key)
+        if match:
+            families.setdefault(match["name"], []).append((key, value))
+    lines = []
+    for name, (kind, help) in METRICS.items():
+        if name in families:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            lines += [f"{key} {value}" for key, value in sorted(families[name])]
+    for name, kind, help, values in extra:
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+        lines += [f"{key} {value}" for key, value in values.items()]
+    return "\n".join(lines) + "\n"
+
+
+def histograms(name):
+    """
+    The `name` histogram per label set, as
+    {labels: {"buckets": [(bound, count)], "sum": seconds, "count": n}}.
+    """
+    result = {}
+    for key, value in samples().items():
+        match = SAMPLE.match(key)
+        if not match or match["name"] != name or not match["suffix"]:
+            continue
+        labels = dict(LABEL.findall(match["labels"]))
+        bound = labels.pop("le", None)
+        histogram = result.setdefault(
+            tuple(sorted(labels.items())), {"buckets": [], "sum": 0.0, "count": 0}
+        )
+        if match["suffix"] == "_bucket":
+            histogram["buckets"].append((float(bound), int(value)))
+        elif match["suffix"] == "_sum":
+            histogram["sum"] = float(value)
+        else:
+            histogram["count"] = int(value)
+    for histogram in result.values():
+        histogram["buckets"].sort()
+    return result
+
+
+def counters(name):
+    result = {}
+    for key, value in samples().items():
+        match = SAMPLE.match(key)
+        if match and match["name"] == name and not match["suffix"]:
+            result[tuple(sorted(LABEL.findall(match["labels"])))] = int(value)
+    return result
+
+
+def quantile(histogram, q):
+    """Estimate a quantile like Prometheus' histogram_quantile()."""
+    count = histogram["count"]
+    if not count:
+        return None
+    rank = q * count
+    lower, below = 0.0, 0
+    for bound, cumulative in histogram["buckets"]:
+        if cumulative >= rank:
+            if bound == float("inf"):
+                return lower
+            if cumulative == below:
+                return bound
+            return lower + (bound - lower) * (rank - below) / (cumulative - below)
+        lower, below = bound, cumulative
+    return lower
+
+
+def reset():
+    get_redis_connection("default").delete(KEY)
+
+
+# Celery signals. Receivers that raise are logged by celery and do not fail
+# the task.
+
+
+# Stamp messages with their publish time, the worker measures the queue wait.
+@before_task_publish.connect
+def stamp_published_at(headers=None, **kwargs):
+    if headers is not None:
+        headers["published_at"] = time.time()
+
+
+# Queue wait of the task, start of its runtime.
+@task_prerun.connect
+def task_started(task_id=None, task=None, **kwargs):
+    with _lock:
+        _running[task_id] = [time.monotonic(), 0.0]
+    published_at = getattr(task.request, "published_at", None)
+    if published_at is None:
+        # eager (apply) calls are not published
+        return
+    eta = task.request.eta
+    if eta:
+        # a retry or countdown task is due at its eta, not when published
+        if isinstance(eta, str):
+            eta = datetime.fromisoformat(eta)
+        published_at = max(published_at, eta.timestamp())
+    observe(
+        "celery_task_queue_wait_seconds", time.time() - published_at, task=task.name
+    )
+
+
+# Runtime and SMS panel time of the task.
+@task_postrun.connect
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    with _lock:
+        running = _running.pop(task_id, None)
+    if running is None:
+        return
+    started, provider = running
+    observe(
+        "celery_task_runtime_seconds",
+        time.monotonic() - started,
+        task=task.name,
+        state=state or "UNKNOWN",
+    )
+    if provider:
+        observe("celery_task_provider_seconds", provider, task=task.name)
+
+
+@task_failure.connect
+def task_failed(sender=None, exception=None, **kwargs):
+    increment(
+        "celery_task_failures_total",
+        task=sender.name,
+        exception=type(exception).__name__,
+    )